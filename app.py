@@ -6,6 +6,7 @@ import sys
 # Add project root to sys.path so we can import from 'backend'
 sys.path.append(os.path.dirname(__file__))
 from backend import crawler
+from backend import http_client
 import pandas as pd
 import FinanceDataReader as fdr
 from dotenv import load_dotenv
@@ -120,14 +121,12 @@ def get_stock_listing_cached(idx):
     try:
         if idx in ["KOSPI", "KOSDAQ"]:
             # Fallback to Naver Mobile API because FDR KRX is often geo-blocked
-            import requests
             import pandas as pd
             url = f"https://m.stock.naver.com/api/stocks/marketValue/{idx}"
-            headers = {"User-Agent": "Mozilla/5.0"}
             all_stocks = []
             page = 1
             while True:
-                res = requests.get(url, params={"page": page, "pageSize": 100}, headers=headers)
+                res = http_client.get(url, params={"page": page, "pageSize": 100})
                 if res.status_code != 200: break
                 try: data = res.json()
                 except: break
@@ -254,7 +253,8 @@ def show_signals(market, date_str):
                 
                 with st.expander("관련 뉴스/정보 보기"):
                     for art in signal.get("news_articles", [])[:5]:
-                        st.markdown(f"• [{art['title']}]({art['url']}) ({art.get('source', '')})")
+                        outlets = f" · {art['cluster_size']}개 매체" if art.get('cluster_size', 1) > 1 else ""
+                        st.markdown(f"• [{art['title']}]({art['url']}) ({art.get('source', '')}{outlets})")
             
             with c2:
                 st.write("**관련 종목**")
@@ -349,13 +349,16 @@ def show_admin():
     
     st.markdown("---")
     st.subheader("🚀 수동 크롤링 실행")
-    c_m = st.selectbox("시장", ["KR", "US"])
+    c_m = st.selectbox("시장", ["KR", "US", "KR+US (동시 실행)"])
     c_d = st.date_input("날짜", datetime.datetime.now().date())
     if st.button("크롤링 실행"):
         with st.spinner("데이터 수집 및 생성 중..."):
-            if crawler.generate_daily_json(c_d.strftime("%Y-%m-%d"), market=c_m):
-                st.success("데이터 생성 완료!")
-            else: st.error("데이터 생성 중 오류가 발생했습니다.")
+            markets = crawler.parse_markets(c_m.split(" ")[0].replace("+", ","))
+            results = crawler.generate_markets(markets, c_d.strftime("%Y-%m-%d"))
+            for m in markets:
+                if results.get(m) is True:
+                    st.success(f"{m} 데이터 생성 완료!")
+                else: st.error(f"{m} 데이터 생성 중 오류가 발생했습니다: {results.get(m)}")
             
     st.markdown("---")
     st.subheader("🌐 글로벌 종목 정보 자동 확장 (AI Bootstrap)")
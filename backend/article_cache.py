@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+try:
+    from backend import instrumentation
+except ImportError: # Executed as `python backend/crawler.py`
+    import instrumentation
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+class ArticleCache:
+    """
+    Content-addressed cache of scraped article bodies.
+    Each canonical URL maps to one small JSON file under root/<xx>/<sha1>.json, written
+    atomically, so the directory can be restored from the Actions cache before a cron run
+    and saved back after it, even one that failed. When it grows past max_bytes, the
+    oldest fetches are evicted until it is back under 90% of the budget.
+    """
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.json")
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.scandir(self.root):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".json"):
+                        yield entry
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = json.load(f).get("content")
+        except (OSError, ValueError):
+            content = None
+        with self._lock:
+            if content:
+                self.hits += 1
+            else:
+                self.misses += 1
+        instrumentation.count("article_cache.hits" if content else "article_cache.misses")
+        return content or None
+
+    def put(self, url, content):
+        if not content:
+            return # Don't pin transient scrape failures
+        path = self._path(url)
+        payload = json.dumps({"url": url, "fetched_at": time.time(), "content": content}, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+            if self._total_bytes is None:
+                self._total_bytes = sum(e.stat().st_size for e in self._entries())
+            else:
+                self._total_bytes += os.path.getsize(path) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    fetched_at = json.load(f).get("fetched_at", 0)
+            except (OSError, ValueError):
+                fetched_at = 0
+            entries.append((fetched_at, entry.stat().st_size, entry.path))
+
+        entries.sort()
+        target = self.max_bytes * 0.9
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
@@ -0,0 +1,210 @@
+import os
+import re
+import glob
+import json
+import zlib
+
+import numpy as np
+
+try:
+    from backend.name_matcher import MARKET_TERMS
+    from backend.headline_clusters import is_placeholder
+except ImportError: # Executed as `python backend/article_ranker.py`
+    from name_matcher import MARKET_TERMS
+    from headline_clusters import is_placeholder
+
+# Hashed feature space shared by training and inference
+N_FEATURES = 1 << 18
+NGRAM_RANGE = (2, 3)
+MIN_CANDIDATES = 3 # with fewer headlines the ranker never claims confidence
+NAME_TOKEN = "§" # stands in for the stock's own name, so patterns carry across stocks
+_WORD_SPLIT = re.compile(r"[\s\[\]\(\)\"'“”‘’,.·…:;!?/]+")
+
+def _hash(kind, token):
+    return zlib.crc32(f"{kind}:{token}".encode("utf-8")) % N_FEATURES
+
+def title_features(title, name):
+    """Sorted unique feature ids for one (headline, stock name) pair."""
+    feats = set()
+    has_name = bool(name) and name in title
+    text = title.replace(name, NAME_TOKEN) if has_name else title
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(text) - n + 1):
+            feats.add(_hash("c", text[i:i + n]))
+    for word in _WORD_SPLIT.split(text):
+        if word:
+            feats.add(_hash("w", word))
+    # Same signals the keyword fallback and TitleMatcher use
+    if has_name:
+        feats.add(_hash("f", "has_name"))
+        if title.startswith(name):
+            feats.add(_hash("f", "leading_name"))
+        if f"[{name}" in title:
+            feats.add(_hash("f", "bracketed_name"))
+    else:
+        feats.add(_hash("f", "no_name"))
+    noise = sum(1 for term in MARKET_TERMS if term in title)
+    feats.add(_hash("f", f"market_noise_{min(noise, 3)}"))
+    feats.add(_hash("b", "bias"))
+    return np.fromiter(sorted(feats), dtype=np.int64)
+
+def _softmax(scores):
+    exp = np.exp(scores - scores.max())
+    return exp / exp.sum()
+
+class ArticleRanker:
+    """
+    Linear model over hashed character n-grams of a headline, trained as a softmax over
+    the candidate list (the archived first article is the positive).
+    rank() costs one feature pass per title and a sum of weights, no network.
+    """
+    def __init__(self, weights):
+        self.weights = weights
+
+    @classmethod
+    def load(cls, path):
+        """Load a trained model, or None when it hasn't been trained yet."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                weights = data["weights"]
+        except Exception as e:
+            print(f"Error loading article ranker: {e}")
+            return None
+        if weights.shape != (N_FEATURES,):
+            print("Article ranker was trained with a different feature space; ignoring it.")
+            return None
+        return cls(weights)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights.astype(np.float32))
+        os.replace(tmp_path, path)
+
+    def scores(self, name, titles):
+        return np.array([self.weights[title_features(t, name)].sum() for t in titles], dtype=np.float64)
+
+    def rank(self, name, titles):
+        """
+        (best index, confidence) over the candidate titles. Confidence is the softmax margin
+        of the best title over the runner-up, so a lone or near-tied candidate scores low;
+        below MIN_CANDIDATES it is 0.
+        """
+        if not titles:
+            return None, 0.0
+        probs = _softmax(self.scores(name, titles))
+        best = int(probs.argmax())
+        if len(titles) < MIN_CANDIDATES:
+            return best, 0.0
+        runner_up = np.partition(probs, -2)[-2]
+        return best, float(probs[best] - runner_up)
+
+def load_training_groups(data_dir="data"):
+    """
+    [(stock name, [titles])] from the KR day files, positive first.
+    Only signals whose first article carries scraped content are used: that article went
+    through selection, while the rest of the list is in crawl order.
+    """
+    groups = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        base = os.path.basename(path)
+        if not re.match(r"\d{4}-\d{2}-\d{2}\.json$", base):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                signals = json.load(f).get("signals", [])
+        except Exception as e:
+            print(f"Skipping {base}: {e}")
+            continue
+        for signal in signals:
+            articles = [a for a in signal.get("news_articles", []) if not is_placeholder(a)]
+            if len(articles) < 2 or not articles[0].get("content"):
+                continue
+            titles = [a.get("title", "") for a in articles]
+            groups.append((signal["main_stock"]["name"], titles))
+    return groups
+
+def _featurize(groups):
+    # Flat CSR-like layout: one row per candidate, group_of[row] -> group index
+    feat_ids, feat_rows, group_of, positives = [], [], [], []
+    row = 0
+    for g, (name, titles) in enumerate(groups):
+        positives.append(row)
+        for title in titles:
+            ids = title_features(title, name)
+            feat_ids.append(ids)
+            feat_rows.append(np.full(len(ids), row, dtype=np.int64))
+            group_of.append(g)
+            row += 1
+    return (np.concatenate(feat_ids), np.concatenate(feat_rows),
+            np.array(group_of, dtype=np.int64), np.array(positives, dtype=np.int64))
+
+def train(groups, epochs=300, lr=0.5, l2=1e-2):
+    """Full-batch AdaGrad on the listwise softmax loss; returns an ArticleRanker."""
+    ids, rows, group_of, positives = _featurize(groups)
+    n_rows = len(group_of)
+    n_groups = len(groups)
+    weights = np.zeros(N_FEATURES)
+    grad_sq = np.full(N_FEATURES, 1e-8)
+    for _ in range(epochs):
+        scores = np.bincount(rows, weights=weights[ids], minlength=n_rows)
+        scores -= np.maximum.reduceat(scores, np.r_[0, np.flatnonzero(np.diff(group_of)) + 1])[group_of]
+        exp = np.exp(scores)
+        probs = exp / np.bincount(group_of, weights=exp, minlength=n_groups)[group_of]
+        coef = probs
+        coef[positives] -= 1.0
+        grad = np.bincount(ids, weights=coef[rows], minlength=N_FEATURES) / n_groups
+        grad += l2 * weights
+        grad_sq += grad * grad
+        weights -= lr * grad / np.sqrt(grad_sq)
+    return ArticleRanker(weights)
+
+def evaluate(ranker, groups, min_confidence):
+    """Top-1 accuracy overall and on the picks at or above min_confidence (the ones kept off the LLM)."""
+    correct = confident = confident_correct = 0
+    for name, titles in groups:
+        best, confidence = ranker.rank(name, titles)
+        correct += best == 0
+        if confidence >= min_confidence:
+            confident += 1
+            confident_correct += best == 0
+    total = max(1, len(groups))
+    return {
+        "groups": len(groups),
+        "accuracy": round(correct / total, 3),
+        "coverage": round(confident / total, 3),
+        "confident_accuracy": round(confident_correct / max(1, confident), 3),
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    parser = argparse.ArgumentParser(description="Train the local article ranker from the archived day files")
+    parser.add_argument("--data-dir", type=str, default="data")
+    parser.add_argument("--output", type=str, default=os.path.join("data", "article_ranker.npz"))
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--min-confidence", type=float, default=float(os.getenv("RANKER_MIN_CONFIDENCE", "0.6")))
+    parser.add_argument("--min-accuracy", type=float, default=0.5, help="Held-out accuracy of confident picks required to save")
+    args = parser.parse_args()
+
+    groups = load_training_groups(args.data_dir)
+    if len(groups) < 10:
+        raise SystemExit(f"Only {len(groups)} labelled signals found in {args.data_dir}; not training.")
+    shuffled = list(groups)
+    random.Random(0).shuffle(shuffled)
+    split = max(1, len(shuffled) // 5)
+    held_out, train_groups = shuffled[:split], shuffled[split:]
+
+    model = train(train_groups, epochs=args.epochs)
+    print(f"Train:    {evaluate(model, train_groups, args.min_confidence)}")
+    report = evaluate(model, held_out, args.min_confidence)
+    print(f"Held out: {report}")
+    if report["confident_accuracy"] < args.min_accuracy:
+        raise SystemExit("Confident picks are not accurate enough on held-out signals; keeping the previous model.")
+
+    # Ship the model trained on everything
+    model = train(groups, epochs=args.epochs)
+    model.save(args.output)
+    print(f"Saved article ranker ({len(groups)} signals) to {args.output}")
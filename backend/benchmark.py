@@ -0,0 +1,88 @@
+"""
+End-to-end benchmark of generate_daily_json without network access.
+
+    python backend/benchmark.py --record          # one live run per market, saved to the cassette
+    python backend/benchmark.py                   # replay the cassette offline
+    python backend/benchmark.py --latency 0.05    # replay with simulated per-request latency
+
+HTTP (Naver, Yahoo) and FinanceDataReader go through http_client's cassette; Gemini is
+always the offline replay backend (LLM_MOCK_* knobs apply). Each run uses a fresh
+temporary DATA_DIR, so caches, watermarks and the price store start empty both when
+recording and when replaying, and the request sequence matches.
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import datetime
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("LLM_BACKEND", "replay")
+
+from backend import crawler
+from backend import http_client
+
+DEFAULT_CASSETTE = os.path.join("tests", "fixtures", "crawl_cassette.json.gz")
+
+def run_market(market, workers):
+    # Same entry as `python backend/crawler.py --market ...`; the stage breakdown is the
+    # run report generate_daily_json writes next to the day file.
+    crawler.generate_daily_json(None, market=market, workers=workers)
+    reports = [name for name in os.listdir(crawler.DATA_DIR) if name.endswith(".run.json")]
+    with open(os.path.join(crawler.DATA_DIR, reports[0]), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def print_report(report):
+    counters = report["counters"]
+    print(f"\n{report['market']} {report['date']}: {report['wall']:.2f}s wall, {report['cpu']:.2f}s CPU, "
+          f"{counters.get('http.requests', 0)} requests, {counters.get('http.bytes', 0) / 1e6:.1f} MB")
+    print(f"  {'stage':<12} {'calls':>6} {'wall s':>8} {'cpu s':>8} {'requests':>9} {'llm s':>7}")
+    for stage, t in report["stages"].items():
+        llm = t["spans"].get("llm", {}).get("wall", 0.0) + t["spans"].get("llm.stream", {}).get("wall", 0.0)
+        print(f"  {stage:<12} {t['calls']:>6} {t['wall']:>8.2f} {t['cpu']:>8.2f} {t['counters'].get('http.requests', 0):>9} {llm:>7.2f}")
+    print(f"  caches: {report.get('caches')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end crawler benchmark")
+    parser.add_argument("--cassette", type=str, default=DEFAULT_CASSETTE)
+    parser.add_argument("--record", action="store_true", help="Run live and (re)write the cassette")
+    parser.add_argument("--markets", type=str, default="KR,US")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per replayed request")
+    parser.add_argument("--workers", type=int, default=crawler.DEFAULT_WORKERS)
+    parser.add_argument("--json", type=str, default=None, help="Also write the reports to this file")
+    args = parser.parse_args()
+
+    markets = [m.strip().upper() for m in args.markets.split(",") if m.strip()]
+    cassette = http_client.use_cassette(args.cassette, "record" if args.record else "replay", args.latency)
+    if args.record:
+        cassette.meta = {"recorded_at": crawler._kst_now().isoformat(), "dates": {}}
+    crawler.KST_NOW_OVERRIDE = datetime.datetime.fromisoformat(cassette.meta["recorded_at"])
+
+    reports = []
+    for market in markets:
+        data_dir = tempfile.mkdtemp(prefix=f"bench_{market}_")
+        os.environ["LLM_RECORD_PATH"] = os.path.join(data_dir, "llm_recordings.jsonl")
+        try:
+            crawler.use_data_dir(data_dir)
+            if not args.record and market not in cassette.meta["dates"]:
+                print(f"{market} is not in {args.cassette}; record it first.")
+                continue
+            report = run_market(market, args.workers)
+            if args.record:
+                cassette.meta["dates"][market] = report["date"]
+            reports.append(report)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.record:
+        cassette.save()
+        print(f"\nSaved cassette to {args.cassette}")
+    elif cassette.misses:
+        print(f"\nWarning: {cassette.misses} requests were not in the cassette (re-record after crawler changes).")
+    for report in reports:
+        print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
@@ -3,9 +3,13 @@ import json
 import time
 import FinanceDataReader as fdr
 import dotenv
-from google import genai
 from concurrent.futures import ThreadPoolExecutor
 
+try:
+    from backend.llm_gateway import LLMGateway
+except ImportError: # Executed as `python backend/bootstrap_metadata.py`
+    from llm_gateway import LLMGateway
+
 dotenv.load_dotenv()
 
 DATA_DIR = "data"
@@ -21,14 +25,19 @@ def save_metadata(metadata):
     with open(METADATA_FILE, "w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=4)
 
+BOOTSTRAP_MODEL = 'gemini-2.0-flash'
+BOOTSTRAP_TIMEOUT = 120
+
 def get_gemini_client():
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
+    """LLM gateway for the configured backend (LLM_BACKEND), or None when it can't be used."""
+    gateway = LLMGateway(api_key=os.environ.get("GEMINI_API_KEY"))
+    if not gateway.available():
         return None
-    return genai.Client(api_key=api_key)
+    return gateway
 
 def process_batch(client, market, tickers_info):
     """
+    client: LLMGateway from get_gemini_client()
     tickers_info: list of {'symbol': '...', 'name': '...'}
     """
     if not client:
@@ -53,11 +62,7 @@ def process_batch(client, market, tickers_info):
     )
     
     try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt
-        )
-        text = response.text.strip()
+        text = client.generate(BOOTSTRAP_MODEL, prompt, timeout=BOOTSTRAP_TIMEOUT).strip()
         # Remove markdown if present
         if text.startswith("```json"):
             text = text[7:-3].strip()
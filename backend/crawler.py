@@ -1,25 +1,47 @@
 import os
 import json
+import shutil
+import tempfile
+import threading
 import datetime
+import contextlib
 from datetime import timedelta
 import dotenv
 
 import FinanceDataReader as fdr
-import requests
-from bs4 import BeautifulSoup
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
-    from google import genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
-    print("Warning: google-genai package not found. AI summaries will be disabled.")
-    GENAI_AVAILABLE = False
-    print("google.generativeai module not found or broken. AI summaries will be mocked.")
-except Exception as e:
-    GENAI_AVAILABLE = False
-    print(f"Error loading google.generativeai: {e}")
+    from backend import html_parse
+    from backend import http_client
+    from backend import instrumentation
+    from backend.article_cache import ArticleCache
+    from backend.article_ranker import ArticleRanker
+    from backend.headline_clusters import HeadlineClusters, is_placeholder
+    from backend.llm_cache import LLMCache, change_bucket, fingerprint
+    from backend.llm_gateway import LLMGateway
+    from backend.json_stream import JSONObjectStream
+    from backend.name_matcher import TitleMatcher
+    from backend.news_watermarks import NewsWatermarks
+    from backend.pipeline import Channel, Pipeline
+    from backend.price_store import PriceStore
+    from backend.run_checkpoint import RunCheckpoint
+except ImportError: # Executed as `python backend/crawler.py`
+    import html_parse
+    import http_client
+    import instrumentation
+    from article_cache import ArticleCache
+    from article_ranker import ArticleRanker
+    from headline_clusters import HeadlineClusters, is_placeholder
+    from llm_cache import LLMCache, change_bucket, fingerprint
+    from llm_gateway import LLMGateway
+    from json_stream import JSONObjectStream
+    from name_matcher import TitleMatcher
+    from news_watermarks import NewsWatermarks
+    from pipeline import Channel, Pipeline
+    from price_store import PriceStore
+    from run_checkpoint import RunCheckpoint
 
 # Load environment variables (e.g., GEMINI_API_KEY)
 dotenv.load_dotenv()
@@ -35,24 +57,75 @@ def load_stock_metadata():
             return json.load(f)
     return {"KR": {}, "US": {}}
 
+def _metadata_mtime():
+    metadata_path = os.path.join(DATA_DIR, "stock_metadata.json")
+    return os.path.getmtime(metadata_path) if os.path.exists(metadata_path) else None
+
 # Global configuration loaded once
 STOCK_METADATA = load_stock_metadata()
+_METADATA_MTIME = _metadata_mtime()
 
 # Reconstruct MAJOR_STOCKS and US_MAJOR_STOCKS lists for backwards compatibility within crawler.py
 MAJOR_STOCKS = [{"symbol": k, "name": v["name"]} for k, v in STOCK_METADATA.get("KR", {}).items()]
 US_MAJOR_STOCKS = [{"symbol": k, "name": v["name"]} for k, v in STOCK_METADATA.get("US", {}).items()]
 
+def reload_stock_metadata():
+    """
+    Re-read stock_metadata.json if it changed on disk since it was loaded, for the
+    long-running service (call between runs). Returns True when it was reloaded.
+    """
+    global STOCK_METADATA, MAJOR_STOCKS, US_MAJOR_STOCKS, _METADATA_MTIME
+    mtime = _metadata_mtime()
+    if mtime == _METADATA_MTIME:
+        return False
+    STOCK_METADATA = load_stock_metadata()
+    MAJOR_STOCKS = [{"symbol": k, "name": v["name"]} for k, v in STOCK_METADATA.get("KR", {}).items()]
+    US_MAJOR_STOCKS = [{"symbol": k, "name": v["name"]} for k, v in STOCK_METADATA.get("US", {}).items()]
+    _METADATA_MTIME = mtime
+    _TITLE_MATCHERS.clear() # compiled from the old names
+    return True
+
+# Concurrency
+# generate_daily_json runs as a staged pipeline (see pipeline.py). Each stage has its own
+# thread count: DEFAULT_WORKERS, or CRAWLER_WORKERS_<STAGE> / --stage-workers per stage.
+# 1 everywhere processes one mover at a time per stage.
+# Per-host in-flight limits live in http_client.HOST_CONCURRENCY.
+DEFAULT_WORKERS = int(os.getenv("CRAWLER_WORKERS", "4"))
+PIPELINE_STAGES = ("price", "news", "complete", "related")
+
+def stage_workers(workers=None, overrides=None):
+    """Thread count per pipeline stage: overrides, then CRAWLER_WORKERS_<STAGE>, then workers."""
+    default = DEFAULT_WORKERS if workers is None else workers
+    overrides = overrides or {}
+    return {
+        stage: max(1, int(overrides.get(stage) or os.getenv(f"CRAWLER_WORKERS_{stage.upper()}", default)))
+        for stage in PIPELINE_STAGES
+    }
+
+# Wall-clock override (naive KST datetime) so a recorded run can be replayed as of the time
+# it was recorded; None means the real clock.
+KST_NOW_OVERRIDE = None
+
+def _kst_now():
+    if KST_NOW_OVERRIDE is not None:
+        return KST_NOW_OVERRIDE
+    return datetime.datetime.utcnow() + timedelta(hours=9)
+
+def _fdr_data_reader(symbol, start, end):
+    """fdr.DataReader through the HTTP cassette when one is active."""
+    with instrumentation.span("fdr"):
+        return http_client.call_recorded("fdr.DataReader", fdr.DataReader, symbol, start, end)
+
 def get_investor_data(symbol, date_str):
     """
     Fetch daily net purchases (개인, 외국인, 기관) from Naver Finance.
     """
     try:
         url = f"https://finance.naver.com/item/frgn.naver?code={symbol}"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = requests.get(url, headers=headers)
+        res = http_client.get(url)
         res.raise_for_status()
         
-        soup = BeautifulSoup(res.text, 'html.parser')
+        soup = html_parse.make_soup(res.text, html_parse.INVESTOR_TABLE)
         
         # Find the table containing the investor data
         # Note: Depending on market time, top row could be today or yesterday.
@@ -124,18 +197,87 @@ def get_investor_data(symbol, date_str):
         
     return None
 
-def get_stock_change(symbol, date_str):
+_PRICE_STORES = {}
+_PRICE_STORES_LOCK = threading.Lock()
+
+def get_price_store(market="KR"):
+    """Daily-bar store for a market, kept under data/prices/ and shared across runs."""
+    with _PRICE_STORES_LOCK:
+        if market not in _PRICE_STORES:
+            _PRICE_STORES[market] = PriceStore(os.path.join(DATA_DIR, "prices", f"{market}.bars"))
+        return _PRICE_STORES[market]
+
+def _symbol_market(symbol):
+    if symbol in STOCK_METADATA.get("US", {}):
+        return "US"
+    return "KR" if symbol.isdigit() else "US"
+
+def _session_final_before(market="KR"):
+    """
+    Sessions dated before the returned YYYY-MM-DD are closed and safe to persist.
+    The current session becomes final once the market has closed (15:40 KST for KR,
+    06:30 KST the next morning for US).
+    """
+    kst_now = _kst_now()
+    session = _session_date(market)
+    if market == "US":
+        close_at = (session + timedelta(days=1)).replace(hour=6, minute=30, second=0, microsecond=0)
+    else:
+        close_at = session.replace(hour=15, minute=40, second=0, microsecond=0)
+    if kst_now >= close_at:
+        session += timedelta(days=1)
+    return session.strftime("%Y-%m-%d")
+
+def _df_to_bars(df):
+    return [
+        (idx.strftime("%Y-%m-%d"), float(row['Open']), float(row['High']), float(row['Low']), float(row['Close']), float(row['Volume']))
+        for idx, row in df.iterrows()
+    ]
+
+def _cached_snapshot_change(symbol, date_str, market):
+    """Change rate from an already-fetched market snapshot, without touching the network."""
+    cached = _SNAPSHOT_CACHE.get(market)
+    if not cached:
+        return None
+    return _snapshot_quote(cached["table"], symbol, date_str, market)
+
+def get_stock_change(symbol, date_str, market=None):
     """
     Fetch actual stock change rate for a given symbol and date.
+    Reads the market snapshot and the local price store first; FDR is only asked for
+    the days the store is missing, and closed sessions are appended to the store.
     """
+    market = market or _symbol_market(symbol)
+    
+    change = _cached_snapshot_change(symbol, date_str, market)
+    if change is not None:
+        return change
+    
+    store = get_price_store(market)
+    change = store.change_pct(symbol, date_str)
+    if change is not None:
+        return change
+    
     try:
         end_date = datetime.datetime.strptime(date_str, "%Y-%m-%d")
-        start_date = end_date - timedelta(days=10) # Enough buffer for weekends
+        start_str = (end_date - timedelta(days=10)).strftime("%Y-%m-%d") # Enough buffer for weekends
         
-        df = fdr.DataReader(symbol, start_date.strftime("%Y-%m-%d"), date_str)
-        if len(df) >= 2:
-            prev_close = df['Close'].iloc[-2]
-            today_close = df['Close'].iloc[-1]
+        # Only download from the last stored session on: it is the previous close of the
+        # first new bar, which chains the new bars onto the store
+        last_stored = store.last_date(symbol)
+        if last_stored and start_str <= last_stored < date_str:
+            start_str = last_stored
+        
+        df = _fdr_data_reader(symbol, start_str, date_str)
+        fetched = _df_to_bars(df)
+        store.append(symbol, fetched, final_before=_session_final_before(market))
+        
+        # Consecutive sessions of one download (possibly still trading); stored closes
+        # could sit on the far side of a gap
+        series = [c for d, _, _, _, c, _ in sorted(fetched) if d <= date_str]
+        if len(series) >= 2:
+            prev_close = series[-2]
+            today_close = series[-1]
             change_pct = ((today_close - prev_close) / prev_close) * 100
             return change_pct
     except Exception as e:
@@ -143,55 +285,267 @@ def get_stock_change(symbol, date_str):
     
     return 0.0
 
-def get_top_movers(date_str, top_n=10, market="KR"):
+# Naver's paged marketValue API returns the change rate of every listed stock,
+# so one short sweep prices the whole universe instead of one FDR call per symbol.
+SNAPSHOT_EXCHANGES = {"KR": ["KOSPI", "KOSDAQ"], "US": ["NASDAQ", "NYSE", "AMEX"]}
+SNAPSHOT_PAGE_SIZE = 100
+SNAPSHOT_MAX_PAGES = 40
+SNAPSHOT_TTL = 300 # seconds; a cron run only needs one sweep per market
+_SNAPSHOT_CACHE = {}
+
+def _snapshot_url(market, exchange):
+    if market == "US":
+        return f"https://api.stock.naver.com/stock/exchange/{exchange}/marketValue"
+    return f"https://m.stock.naver.com/api/stocks/marketValue/{exchange}"
+
+def get_market_snapshot(market="KR", symbols=None):
+    """
+    Fetch the change rate of every listed stock in a market from Naver's marketValue API.
+    Returns {symbol: {"name": ..., "change": float, "traded_at": "YYYY-MM-DD" or ""}}.
+    If `symbols` is given, paging stops as soon as all of them have been seen.
+    """
+    import time
+    wanted = set(symbols) if symbols else None
+    
+    cached = _SNAPSHOT_CACHE.get(market)
+    if cached and time.time() - cached["fetched_at"] < SNAPSHOT_TTL:
+        if cached["complete"] or (wanted and wanted.issubset(cached["table"])):
+            return cached["table"]
+    
+    table = {}
+    complete = True
+    for exchange in SNAPSHOT_EXCHANGES.get(market, []):
+        url = _snapshot_url(market, exchange)
+        for page in range(1, SNAPSHOT_MAX_PAGES + 1):
+            try:
+                res = http_client.get(url, params={"page": page, "pageSize": SNAPSHOT_PAGE_SIZE})
+                if res.status_code != 200:
+                    complete = False
+                    break
+                stocks = res.json().get('stocks', [])
+            except Exception as e:
+                print(f"Error fetching {exchange} snapshot page {page}: {e}")
+                complete = False
+                break
+            if not stocks: break
+            
+            for item in stocks:
+                symbol = item.get("symbolCode") or item.get("itemCode")
+                try:
+                    change = float(str(item.get("fluctuationsRatio", "")).replace(",", ""))
+                except ValueError:
+                    continue
+                if symbol:
+                    table[symbol] = {
+                        "name": item.get("stockName", symbol),
+                        "change": change,
+                        "traded_at": (item.get("localTradedAt") or "")[:10]
+                    }
+            
+            if wanted and wanted.issubset(table):
+                break
+        if wanted and wanted.issubset(table):
+            complete = False # Stopped early on purpose; other symbols may be missing
+            break
+    
+    _SNAPSHOT_CACHE[market] = {"fetched_at": time.time(), "table": table, "complete": complete}
+    return table
+
+def _snapshot_quote(snapshot, symbol, date_str, market):
+    """
+    Return the snapshot change for `symbol` if the snapshot describes the `date_str` session, else None.
+    """
+    quote = snapshot.get(symbol)
+    if quote is None:
+        return None
+    if quote["traded_at"]:
+        return quote["change"] if quote["traded_at"] == date_str else None
+    # No trade date in the payload: trust it only for the session currently being attributed
+    return quote["change"] if date_str == _session_date(market).strftime("%Y-%m-%d") else None
+
+class PriceCache:
+    """
+    Run-scoped memo of change rates so each (symbol, date) is priced at most once per
+    generate_daily_json run, whether it is asked for as a mover or as a related stock.
+    """
+    def __init__(self):
+        self._changes = {}
+        self._inflight = {} # key -> Event, so concurrent stages never price a symbol twice
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def put(self, symbol, date_str, change):
+        with self._lock:
+            self._changes[(symbol, date_str)] = change
+    
+    def get_change(self, symbol, date_str, market=None):
+        key = (symbol, date_str)
+        while True:
+            with self._lock:
+                if key in self._changes:
+                    self.hits += 1
+                    return self._changes[key]
+                event = self._inflight.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._inflight[key] = threading.Event()
+                    break
+            event.wait() # another stage is pricing it
+        try:
+            change = get_stock_change(symbol, date_str, market=market)
+            with self._lock:
+                self._changes[key] = change
+            return change
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+    
+    def items(self):
+        """[(symbol, date_str, change)] for every price held, e.g. for a run checkpoint."""
+        with self._lock:
+            return [(symbol, date_str, change) for (symbol, date_str), change in self._changes.items()]
+    
+    def stats(self):
+        with self._lock:
+            return f"{self.hits} hits / {self.misses} misses ({len(self._changes)} prices held)"
+
+def _get_change(symbol, date_str, market, price_cache=None):
+    if price_cache is None:
+        return get_stock_change(symbol, date_str, market=market)
+    return price_cache.get_change(symbol, date_str, market=market)
+
+def get_top_movers(date_str, top_n=10, market="KR", price_cache=None, workers=1):
     """
     Find top movers from MAJOR_STOCKS or US_MAJOR_STOCKS for a given date.
     Sorts by absolute change percentage.
     """
+    movers = list(iter_top_movers(date_str, top_n=top_n, market=market, price_cache=price_cache, workers=workers))
+    movers.sort(key=_mover_rank)
+    return movers
+
+def _mover_rank(mover):
+    return (-abs(mover['change']), mover['position'])
+
+def iter_top_movers(date_str, top_n=10, market="KR", price_cache=None, workers=1):
+    """
+    Yield the top movers as soon as each one is certain to make the cut, not in rank order.
+    Prices come from the market-wide snapshot when it covers `date_str`; symbols it
+    doesn't cover (or historical dates) fall back to per-symbol FDR requests on `workers`
+    threads. A priced mover is certain once the movers already ranked above it plus the
+    stocks still unpriced are fewer than top_n, so with a full snapshot every mover is
+    released at once and on the FDR path the strongest ones go ahead of the slow tail.
+    """
     print(f"Finding top movers for {date_str} among {market} major stocks...")
-    movers = []
     stocks_list = US_MAJOR_STOCKS if market == "US" else MAJOR_STOCKS
     
-    for stock in stocks_list:
-        change = get_stock_change(stock['symbol'], date_str)
+    snapshot = {}
+    recent_cutoff = (_session_date(market) - timedelta(days=7)).strftime("%Y-%m-%d")
+    if date_str >= recent_cutoff: # The snapshot only knows the latest session
+        try:
+            snapshot = get_market_snapshot(market, symbols=[s['symbol'] for s in stocks_list])
+        except Exception as e:
+            print(f"Error fetching {market} market snapshot: {e}")
+    
+    priced = [] # movers priced so far, uncertified or not
+    released = set()
+    pending = len(stocks_list)
+    
+    def add(position, stock, change):
+        nonlocal pending
+        pending -= 1
         if abs(change) > 0.01: # Ignore tiny changes
-            movers.append({
+            priced.append({
                 "symbol": stock['symbol'],
                 "name": stock['name'],
                 "change": change,
                 "change_rate": f"{'+' if change >= 0 else ''}{change:.1f}%",
-                "market": market
+                "market": market,
+                "position": position
             })
     
-    # Sort by absolute change value descending
-    movers.sort(key=lambda x: abs(x['change']), reverse=True)
-    return movers[:top_n]
+    def certified():
+        priced.sort(key=_mover_rank)
+        ready = []
+        for rank, mover in enumerate(priced[:top_n]):
+            if rank + pending < top_n and mover['symbol'] not in released:
+                released.add(mover['symbol'])
+                ready.append(mover)
+        return ready
+    
+    fallback = []
+    for position, stock in enumerate(stocks_list):
+        change = _snapshot_quote(snapshot, stock['symbol'], date_str, market)
+        if change is None:
+            fallback.append((position, stock))
+            continue
+        if price_cache is not None:
+            price_cache.put(stock['symbol'], date_str, change)
+        add(position, stock, change)
+    yield from certified()
+    
+    if fallback:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(instrumentation.bind(_get_change), stock['symbol'], date_str, market, price_cache): (position, stock)
+                for position, stock in fallback
+            }
+            for future in as_completed(futures):
+                position, stock = futures[future]
+                add(position, stock, future.result())
+                yield from certified()
+    
+    print(f"Priced {len(stocks_list) - len(fallback)} stocks from snapshot, {len(fallback)} via FDR fallback.")
 
-def scrape_article_content(url):
+ARTICLE_CACHE_MAX_BYTES = 20 * 1024 * 1024
+_ARTICLE_CACHE = None
+
+# Guards the lazy process-wide singletons below, which concurrent market runs share
+_SINGLETONS_LOCK = threading.RLock()
+
+def get_article_cache():
+    """Persistent article body cache under data/article_cache/, shared across runs."""
+    global _ARTICLE_CACHE
+    with _SINGLETONS_LOCK:
+        if _ARTICLE_CACHE is None:
+            _ARTICLE_CACHE = ArticleCache(os.path.join(DATA_DIR, "article_cache"), max_bytes=ARTICLE_CACHE_MAX_BYTES)
+        return _ARTICLE_CACHE
+
+def canonical_article_url(url):
     """
-    Fetch and extract the main text content from a Naver news article.
+    Rewrite Naver Finance article links (office_id/article_id query) and mobile news links
+    to the canonical n.news.naver.com/mnews/article/{office}/{article} form.
     """
+    import re
     if "article_id=" in url and "office_id=" in url:
-        import re
         article_id = re.search(r'article_id=(\d+)', url)
         office_id = re.search(r'office_id=(\d+)', url)
         if article_id and office_id:
-            url = f"https://n.news.naver.com/mnews/article/{office_id.group(1)}/{article_id.group(1)}"
+            return f"https://n.news.naver.com/mnews/article/{office_id.group(1)}/{article_id.group(1)}"
+    match = re.match(r'https?://n\.news\.naver\.com/(?:mnews/)?article/(\d+)/(\d+)', url)
+    if match:
+        return f"https://n.news.naver.com/mnews/article/{match.group(1)}/{match.group(2)}"
+    return url
+
+def scrape_article_content(url):
+    """
+    Fetch and extract the main text content from a Naver news article.
+    Bodies are cached on disk by canonical URL, so each article is downloaded once.
+    """
+    url = canonical_article_url(url)
+    cache = get_article_cache()
+    cached = cache.get(url)
+    if cached:
+        return cached
 
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
         # Naver Finance is euc-kr, but n.news.naver.com is utf-8
-        if "n.news.naver.com" in url:
-            response.encoding = 'utf-8'
-        else:
-            response.encoding = 'euc-kr'
+        encoding = 'utf-8' if "n.news.naver.com" in url else 'euc-kr'
+        response = http_client.get(url, encoding=encoding)
+        response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = html_parse.make_soup(response.text, html_parse.ARTICLE_BODY)
         
         # Naver News main content area
         # Try multiple selectors for different Naver news layouts
@@ -207,50 +561,130 @@ def scrape_article_content(url):
             # Remove scripts and styles
             for script_or_style in content(['script', 'style', 'span', 'a']):
                 script_or_style.decompose()
-            return content.get_text(strip=True, separator='\n')[:2000] # Limit to 2000 chars
+            text = html_parse.text_prefix(content, 2000) # Limit to 2000 chars
+            cache.put(url, text)
+            return text
     except Exception as e:
         print(f"Error scraping article content: {e}")
     return ""
 
-def is_relevant_article(title, stock_name):
+def is_relevant_article(title, stock_name, market="KR"):
     """
     Check if the article title is likely relevant to the stock.
     """
-    import re
-    
-    # 1. Broad Market Downranking
-    market_terms = ["코스피", "코스닥", "지수", "시황", "마감", "뉴욕증시", "블루칩", "글로벌 증시", "아시아 증시"]
-    market_count = sum(1 for term in market_terms if term in title)
-    
-    # 2. Strict Subject Check (Primary focus on this stock)
-    subject_patterns = [
-        rf"\[.*{re.escape(stock_name)}.*\]", # [삼성전자]
-        rf"{re.escape(stock_name)}\s*[:]",      # 삼성전자 :
-        rf"^{re.escape(stock_name)}"          # 삼성전자 (start of title)
-    ]
-    is_main_subject = any(re.search(p, title) for p in subject_patterns)
+    score = get_title_matcher_for(stock_name, market).classify(title, stock_name)
 
-    # 3. Decision Logic
     # Reject if it's a broad market wrap-up and the stock isn't the headline subject
-    if market_count >= 2 and not is_main_subject:
+    if score.market_noise >= 2 and not score.is_main_subject:
         return False
 
     # Standard check: must contain the stock name
-    return stock_name in title
+    return score.has_name
+
+NEWS_MAX_PAGES = 15
+_NEWS_WATERMARKS = None
+
+def get_news_watermarks():
+    """Per-symbol newest-article watermarks under data/news_watermarks.json."""
+    global _NEWS_WATERMARKS
+    with _SINGLETONS_LOCK:
+        if _NEWS_WATERMARKS is None:
+            _NEWS_WATERMARKS = NewsWatermarks(os.path.join(DATA_DIR, "news_watermarks.json"))
+        return _NEWS_WATERMARKS
+
+def _fetch_naver_news_rows(symbol, target_clean, oldest_clean, stop_url=None):
+    """
+    Page through the Naver news list for a symbol, newest first.
+    Stops at the watermark article `stop_url`, once target-date rows have been seen and an
+    older row shows up, or once rows get older than the lookback window.
+    Returns raw rows: {"title", "url", "date", "source"}.
+    """
+    rows_out = []
+    seen_target = False
+    for page in range(1, NEWS_MAX_PAGES + 1):
+        url = f"https://finance.naver.com/item/news_news.naver?code={symbol}&page={page}&sm=title_entity_id.basic&clusterId="
+        
+        try:
+            headers = {'Referer': f'https://finance.naver.com/item/news.naver?code={symbol}'}
+            response = http_client.get(url, headers=headers, encoding='euc-kr')
+            response.raise_for_status()
+            
+            soup = html_parse.make_soup(response.text, html_parse.NEWS_LIST)
+            rows = soup.select('table.type5 tbody tr')
+            if not rows: break
+            
+            stop = False
+            for row in rows:
+                tds = row.select('td')
+                if len(tds) < 2: continue
+                
+                title_td = row.select_one('td.title')
+                a_tag = title_td.select_one('a') if title_td else row.select_one('a')
+                if not a_tag: continue
+                    
+                title = a_tag.get_text(strip=True)
+                href = a_tag.get('href', '')
+                if not title: continue
+                full_url = f"https://finance.naver.com{href}" if href.startswith('/') else href
+                if stop_url and full_url == stop_url:
+                    stop = True
+                    break
+                
+                date_td = row.select_one('td.date')
+                article_date_full = date_td.get_text(strip=True) if date_td else ""
+                article_date_only = article_date_full.split(" ")[0]
+                if "." in article_date_only:
+                    if article_date_only < oldest_clean or (seen_target and article_date_only < target_clean):
+                        stop = True
+                        break
+                    if article_date_only == target_clean:
+                        seen_target = True
+                
+                info_td = row.select_one('td.info')
+                rows_out.append({
+                    "title": title,
+                    "url": full_url,
+                    "date": article_date_full,
+                    "source": info_td.get_text(strip=True) if info_td else ""
+                })
+            
+            if stop: break
+                    
+        except Exception as e:
+            print(f"Error scraping Naver news page {page}: {e}")
+            break
+    return rows_out
 
 def scrape_naver_news(symbol, name, target_date_str, max_articles=20):
     """
     Scrape news for a given stock. Performs a 2-day lookback if target date news is not found.
+    Paging stops at the newest article seen by the previous run (see NewsWatermarks) and the
+    new rows are merged with the stored ones, so intraday runs usually fetch a single page.
     """
     print(f"Scraping news for {name} ({symbol})...")
     
     # Try current date, then day-1, then day-2
     target_date = datetime.datetime.strptime(target_date_str, "%Y-%m-%d")
     lookback_days = [target_date, target_date - timedelta(days=1), target_date - timedelta(days=2)]
+    target_clean = lookback_days[0].strftime("%Y.%m.%d")
+    oldest_clean = lookback_days[-1].strftime("%Y.%m.%d")
+    
+    # Watermarks only describe the latest crawl, so backfills of older dates crawl in full
+    watermarks = get_news_watermarks()
+    state = watermarks.get(symbol)
+    incremental = bool(state) and state["newest"]["date"][:10] <= target_clean
+    stop_url = state["newest"]["url"] if incremental else None
+    
+    raw_rows = _fetch_naver_news_rows(symbol, target_clean, oldest_clean, stop_url=stop_url)
+    if incremental:
+        print(f"Fetched {len(raw_rows)} new news rows for {name} since last run.")
+        fetched_urls = {r["url"] for r in raw_rows}
+        raw_rows += [r for r in state["rows"] if r["url"] not in fetched_urls]
+    watermarks.update(symbol, raw_rows, keep_since=oldest_clean)
     
     articles = []
     seen_titles = set()
-    seen_hours = set()
+    matcher = get_title_matcher_for(name, "KR")
     
     for current_date in lookback_days:
         date_clean = current_date.strftime("%Y.%m.%d")
@@ -260,83 +694,24 @@ def scrape_naver_news(symbol, name, target_date_str, max_articles=20):
         # articles without hour info (rare on Naver but possible)
         no_hour_articles = []
         
-        found_older_date = False
-        for page in range(1, 16):
-            url = f"https://finance.naver.com/item/news_news.naver?code={symbol}&page={page}&sm=title_entity_id.basic&clusterId="
+        for row in raw_rows:
+            title = row["title"]
+            if title in seen_titles: continue
             
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                    'Referer': f'https://finance.naver.com/item/news.naver?code={symbol}'
-                }
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                response.encoding = 'euc-kr'
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                rows = soup.select('table.type5 tbody tr')
-                if not rows: break
-                
-                for row in rows:
-                    tds = row.select('td')
-                    if len(tds) < 2: continue
-                    
-                    title_td = row.select_one('td.title')
-                    a_tag = title_td.select_one('a') if title_td else row.select_one('a')
-                    if not a_tag: continue
-                        
-                    title = a_tag.get_text(strip=True)
-                    href = a_tag.get('href', '')
-                    if not title or title in seen_titles: continue
-                    
-                    date_td = row.select_one('td.date')
-                    article_date_full = date_td.get_text(strip=True) if date_td else ""
-                    date_parts = article_date_full.split(" ")
-                    article_date_only = date_parts[0]
-                    article_hour = date_parts[1].split(":")[0] if len(date_parts) > 1 else ""
-                    
-                    if article_date_only == date_clean:
-                        full_url = f"https://finance.naver.com{href}" if href.startswith('/') else href
-                        info_td = row.select_one('td.info')
-                        source = info_td.get_text(strip=True) if info_td else ""
-                        
-                        import re
-                        has_name = False
-                        if len(name) <= 2:
-                            # Strict match for short names (e.g. SK, LG)
-                            # Match if name is followed by space, punctuation, or start/end of string
-                            # Avoid matching subsidiaries like "SK온", "SK하이닉스"
-                            pattern = rf"(?:^|[^가-힣a-zA-Z0-9]){re.escape(name)}(?:$|[^가-힣a-zA-Z0-9])"
-                            if re.search(pattern, title):
-                                has_name = True
-                        else:
-                            has_name = name in title
-
-                        article_data = {
-                            "title": title, 
-                            "url": full_url, 
-                            "date": article_date_full, 
-                            "source": source,
-                            "has_name": has_name
-                        }
-                        
-                        if article_hour:
-                            if article_hour not in hour_buckets:
-                                hour_buckets[article_hour] = []
-                            hour_buckets[article_hour].append(article_data)
-                        else:
-                            no_hour_articles.append(article_data)
-                        
-                        seen_titles.add(title)
-                    elif article_date_only < date_clean and "." in article_date_only:
-                        found_older_date = True
-                        break
-                
-                if found_older_date: break
-                        
-            except Exception as e:
-                print(f"Error scraping Naver news page {page}: {e}")
-                break
+            date_parts = row["date"].split(" ")
+            if date_parts[0] != date_clean: continue
+            article_hour = date_parts[1].split(":")[0] if len(date_parts) > 1 else ""
+            
+            article_data = dict(row, has_name=matcher.classify(title, name).has_name)
+            
+            if article_hour:
+                if article_hour not in hour_buckets:
+                    hour_buckets[article_hour] = []
+                hour_buckets[article_hour].append(article_data)
+            else:
+                no_hour_articles.append(article_data)
+            
+            seen_titles.add(title)
         
         # Process collected articles for the current_date
         deduplicated = []
@@ -366,10 +741,101 @@ def scrape_naver_news(symbol, name, target_date_str, max_articles=20):
 
     if not articles:
         # Generic professional fallback
-        articles = [{"title": f"{name}, 시장 흐름 및 관련 테마 분석", "url": f"https://finance.naver.com/item/news.naver?code={symbol}", "date": target_date_str.replace("-", ".") + " 09:00", "source": "증권정보"}]
+        articles = [{"title": f"{name}, 시장 흐름 및 관련 테마 분석", "url": f"https://finance.naver.com/item/news.naver?code={symbol}", "date": target_date_str.replace("-", ".") + " 09:00", "source": "증권정보", "placeholder": True}]
+    
+    return articles
+
+# News mode: "symbol" crawls each mover's own news list, "market" crawls the market-wide
+# Naver Finance listing once per run and fans headlines out to the stocks they mention.
+DEFAULT_NEWS_MODE = os.getenv("CRAWLER_NEWS_MODE", "symbol")
+MARKET_NEWS_MAX_PAGES = 30
+_TITLE_MATCHERS = {}
+
+def get_title_matcher(market="KR"):
+    """
+    Headline matcher over the market's STOCK_METADATA names, compiled once per process.
+    US names are matched case-insensitively ("Nvidia" vs "NVIDIA").
+    """
+    if market not in _TITLE_MATCHERS:
+        names = {k: v.get("name", "") for k, v in STOCK_METADATA.get(market, {}).items()}
+        _TITLE_MATCHERS[market] = TitleMatcher(names, ignore_case=(market == "US"))
+    return _TITLE_MATCHERS[market]
+
+def get_title_matcher_for(name, market="KR"):
+    """The market matcher if it knows `name`, otherwise a one-name matcher (cached)."""
+    matcher = get_title_matcher(market)
+    if matcher.knows(name):
+        return matcher
+    key = (market, name)
+    if key not in _TITLE_MATCHERS:
+        _TITLE_MATCHERS[key] = TitleMatcher({name: name}, ignore_case=(market == "US"))
+    return _TITLE_MATCHERS[key]
+
+def scrape_market_news(target_date_str):
+    """
+    Scrape the market-wide Naver Finance news listing (증권 실시간 속보) for a date.
+    Returns [{"title", "url", "date", "source"}], newest first.
+    """
+    print(f"Scraping market-wide news for {target_date_str}...")
+    date_param = target_date_str.replace("-", "")
+    articles = []
+    seen_urls = set()
+    
+    for page in range(1, MARKET_NEWS_MAX_PAGES + 1):
+        url = f"https://finance.naver.com/news/news_list.naver?mode=LSS2D&section_id=101&section_id2=258&date={date_param}&page={page}"
+        try:
+            response = http_client.get(url, encoding='euc-kr')
+            response.raise_for_status()
+            soup = html_parse.make_soup(response.text, html_parse.MARKET_NEWS_LIST)
+            
+            new_on_page = 0
+            for subject in soup.select('.realtimeNewsList .articleSubject'):
+                a_tag = subject.select_one('a')
+                if not a_tag: continue
+                title = (a_tag.get('title') or a_tag.get_text()).strip()
+                href = a_tag.get('href', '')
+                full_url = f"https://finance.naver.com{href}" if href.startswith('/') else href
+                if not title or full_url in seen_urls: continue
+                
+                summary = subject.find_next_sibling('dd', class_='articleSummary')
+                press = summary.select_one('.press') if summary else None
+                wdate = summary.select_one('.wdate') if summary else None
+                # "2026-03-02 16:15:03" -> "2026.03.02 16:15" to match the per-symbol list format
+                date_full = wdate.get_text(strip=True).replace("-", ".")[:16] if wdate else ""
+                
+                articles.append({
+                    "title": title,
+                    "url": full_url,
+                    "date": date_full,
+                    "source": press.get_text(strip=True) if press else ""
+                })
+                seen_urls.add(full_url)
+                new_on_page += 1
+            
+            # Past the last page Naver keeps serving the final page again
+            if not new_on_page: break
+        except Exception as e:
+            print(f"Error scraping market news page {page}: {e}")
+            break
     
     return articles
 
+def build_market_news_index(target_date_str, market="KR", max_articles=20):
+    """
+    Crawl the market-wide listing once and tag each headline to every stock it mentions.
+    Returns {symbol: [articles]} (newest first), shared by every signal of the run.
+    """
+    matcher = get_title_matcher(market)
+    index = {}
+    headlines = scrape_market_news(target_date_str)
+    for article in headlines:
+        for symbol in matcher.find(article["title"]):
+            bucket = index.setdefault(symbol, [])
+            if len(bucket) < max_articles:
+                bucket.append(dict(article, has_name=True))
+    print(f"Tagged {len(headlines)} market headlines to {len(index)} stocks.")
+    return index
+
 def scrape_us_news(symbol, name, target_date_str, max_articles=5):
     """
     Scrape English news headlines and links from Yahoo Finance RSS.
@@ -379,14 +845,14 @@ def scrape_us_news(symbol, name, target_date_str, max_articles=5):
     
     url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={symbol}&region=US&lang=en-US"
     articles = []
+    matcher = get_title_matcher_for(name, "US")
     
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        res = requests.get(url, headers=headers, timeout=10)
+        res = http_client.get(url)
         res.raise_for_status()
         
         root = ET.fromstring(res.text)
-        for item in root.findall('./channel/item')[:max_articles]:
+        for item in root.findall('./channel/item'):
             title_el = item.find('title')
             link_el = item.find('link')
             pub_date_el = item.find('pubDate')
@@ -412,62 +878,104 @@ def scrape_us_news(symbol, name, target_date_str, max_articles=5):
                     "url": link,
                     "date": pub_date,
                     "source": "Yahoo Finance",
-                    "has_name": True # Assume RSS feeds are highly targeted
+                    "has_name": matcher.classify(title, name).has_name
                 })
     except Exception as e:
         print(f"Error scraping US news for {symbol}: {e}")
+    
+    # The feed is ticker-targeted, but headlines naming the company go first (stable sort keeps feed order)
+    articles.sort(key=lambda a: not a["has_name"])
+    articles = articles[:max_articles]
         
     if not articles:
-        articles = [{"title": f"{name} Market Analysis", "url": f"https://finance.yahoo.com/quote/{symbol}", "date": target_date_str, "source": "Yahoo Finance", "has_name": True}]
+        articles = [{"title": f"{name} Market Analysis", "url": f"https://finance.yahoo.com/quote/{symbol}", "date": target_date_str, "source": "Yahoo Finance", "has_name": True, "placeholder": True}]
         
     return articles
 
-def select_impactful_article(stock_name, articles, change_val):
+SELECT_MODEL = 'gemini-2.5-flash-lite'
+SELECT_TIMEOUT = 20 # one request covers every mover
+_LLM_CACHE = None
+
+def get_llm_cache():
+    """Persistent Gemini response cache under data/llm_cache.json."""
+    global _LLM_CACHE
+    with _SINGLETONS_LOCK:
+        if _LLM_CACHE is None:
+            _LLM_CACHE = LLMCache(os.path.join(DATA_DIR, "llm_cache.json"))
+        return _LLM_CACHE
+
+# Local ranker trained by `python backend/article_ranker.py`; Gemini only sees the movers
+# it is unsure about.
+RANKER_MIN_CONFIDENCE = float(os.getenv("RANKER_MIN_CONFIDENCE", "0.6"))
+_ARTICLE_RANKER = None
+_ARTICLE_RANKER_LOADED = False
+
+def get_article_ranker():
+    """Trained ranker from data/article_ranker.npz, or None when there is none yet."""
+    global _ARTICLE_RANKER, _ARTICLE_RANKER_LOADED
+    with _SINGLETONS_LOCK:
+        if not _ARTICLE_RANKER_LOADED:
+            _ARTICLE_RANKER = ArticleRanker.load(os.path.join(DATA_DIR, "article_ranker.npz"))
+            _ARTICLE_RANKER_LOADED = True
+        return _ARTICLE_RANKER
+
+_LLM_GATEWAY = None
+
+def get_llm_gateway():
+    """Process-wide Gemini gateway; per-model latency stats persist in data/llm_stats.json."""
+    global _LLM_GATEWAY
+    with _SINGLETONS_LOCK:
+        if _LLM_GATEWAY is None:
+            _LLM_GATEWAY = LLMGateway(api_key=os.getenv("GEMINI_API_KEY"), stats_path=os.path.join(DATA_DIR, "llm_stats.json"))
+        return _LLM_GATEWAY
+
+def use_data_dir(path):
+    """Point DATA_DIR at `path` and drop every store opened under the previous one."""
+    global DATA_DIR, _ARTICLE_CACHE, _NEWS_WATERMARKS, _LLM_CACHE, _LLM_GATEWAY, _ARTICLE_RANKER, _ARTICLE_RANKER_LOADED
+    DATA_DIR = path
+    _PRICE_STORES.clear()
+    _SNAPSHOT_CACHE.clear()
+    _ARTICLE_CACHE = None
+    _NEWS_WATERMARKS = None
+    _LLM_CACHE = None
+    _LLM_GATEWAY = None
+    _ARTICLE_RANKER = None
+    _ARTICLE_RANKER_LOADED = False
+
+def use_scratch_data_dir():
     """
-    Use Gemini to select the index of the most impactful article from the list.
-    Strictly prioritizes company-specific events over broad market news.
+    Move the run to a fresh temporary DATA_DIR seeded with the stock list and ranker, so
+    replay or mock-server output never lands in data/ (day files, caches, price store).
+    """
+    scratch = tempfile.mkdtemp(prefix="crawler_offline_")
+    for name in ("stock_metadata.json", "article_ranker.npz"):
+        if os.path.exists(os.path.join(DATA_DIR, name)):
+            shutil.copy2(os.path.join(DATA_DIR, name), scratch)
+    use_data_dir(scratch)
+    return scratch
+
+# Markets crawled concurrently (--market all, the service) share the gateway and its two
+# Gemini slots. Their Gemini phases take turns: each market's select request and summary
+# streams get every slot instead of queueing behind the other market's until they time out.
+_LLM_PHASE_LOCK = threading.Lock()
+
+@contextlib.contextmanager
+def llm_phase():
+    with instrumentation.span("llm.phase_wait"):
+        _LLM_PHASE_LOCK.acquire()
+    try:
+        yield
+    finally:
+        _LLM_PHASE_LOCK.release()
+
+def _select_cache_key(stock_name, articles, change_val):
+    return fingerprint("select", SELECT_MODEL, stock_name, [a['title'] for a in articles], change_bucket(change_val))
+
+def _keyword_select(stock_name, articles):
+    """
+    Rule-based best guess (Keywords), used when Gemini is unavailable or fails.
+    Downrank market keywords, Uprank company keywords.
     """
-    direction = "상승" if change_val >= 0 else "하락"
-    api_key = os.getenv("GEMINI_API_KEY")
-    if api_key and api_key != "your_api_key_here" and GENAI_AVAILABLE:
-        try:
-            client = genai.Client(api_key=api_key)
-            
-            prompt = (
-                f"{stock_name}의 주가가 오늘 {direction}했습니다. 다음 뉴스 헤드라인 중 "
-                f"이 변동에 가장 큰 원인이 되었을 것으로 판단되는 기사의 번호(0부터 시작)만 하나 골라주세요.\n"
-                f"**핵심 지침:**\n"
-                f"1. **회사 특정적 뉴스 우선**: '실적', '수주', '인수/합병', '신제품', '신고가 경신' 등 {stock_name} 회사 자체의 소식을 최우선으로 선택하세요.\n"
-                f"2. **시장/지수 전체 뉴스 배제**: '코스피 상승', '시황 마감', '지수 5000 돌파' 등 시장 전체 흐름을 다루는 뉴스는 {stock_name} 전용 뉴스가 있다면 무조건 제외하세요.\n"
-                f"3. 만약 회사와 관련된 뉴스가 하나도 없다면 'none'이라고 답해주세요.\n\n"
-                + "\n".join([f"{i}: {a['title']}" for i, a in enumerate(articles)]) +
-                "\n\n응답은 반드시 숫자 하나 또는 'none'만 해주세요."
-            )
-            
-            # Using ThreadPoolExecutor without 'with' to avoid blocking on timeout
-            from concurrent.futures import ThreadPoolExecutor, TimeoutError
-            executor = ThreadPoolExecutor(max_workers=1)
-            future = executor.submit(
-                client.models.generate_content,
-                model='gemini-2.5-flash-lite',
-                contents=prompt
-            )
-            response = future.result(timeout=10)
-                
-            if response and response.text:
-                import re
-                if 'none' in response.text.lower():
-                    return -1
-                match = re.search(r'\d+', response.text)
-                if match:
-                    idx = int(match.group())
-                    if 0 <= idx < len(articles):
-                        return idx
-        except Exception as e:
-            print(f"Error selecting article: {e}")
-            
-    # Fallback: Rule-based best guess (Keywords)
-    # Downrank market keywords, Uprank company keywords
     company_keywords = ["신고가", "최다주주", "실적", "수주", "영업이익", "흑자", "배당", "인수", "합병", "공시", "특징주"]
     market_keywords = ["코스피", "지수", "시황", "마감", "뉴욕증시"]
     
@@ -483,6 +991,178 @@ def select_impactful_article(stock_name, articles, change_val):
     scored_articles.sort(reverse=True)
     return scored_articles[0][1] if scored_articles else 0
 
+def select_impactful_articles_batch(items):
+    """
+    Pick the most impactful article for every mover in one Gemini request.
+    items = [{"symbol": "...", "name": "...", "articles": [...], "change_val": 5.2}, ...]
+    Returns {symbol: best_idx | None}; None means Gemini found no company-specific news.
+    Confident picks of the local ranker skip Gemini entirely. Gemini decisions are cached
+    per stock by (model, headlines, change bucket); stocks missing from the response, or
+    every pending stock when the request fails, get the keyword fallback.
+    Placeholder articles are never candidates; a stock with nothing else gets None.
+    """
+    # Select among the real articles only; indices are mapped back at the end
+    positions = {}
+    candidates = []
+    for item in items:
+        positions[item["symbol"]] = [i for i, a in enumerate(item["articles"]) if not is_placeholder(a)]
+        candidates.append(dict(item, articles=[item["articles"][i] for i in positions[item["symbol"]]]))
+    items = candidates
+    
+    results = {}
+    pending = []
+    llm_cache = get_llm_cache()
+    ranker = get_article_ranker()
+    ranked = 0
+    gateway = get_llm_gateway()
+    use_ai = gateway.available()
+    for item in items:
+        if not item["articles"]:
+            results[item["symbol"]] = None
+            continue
+        if ranker is not None:
+            best_idx, confidence = ranker.rank(item["name"], [a['title'] for a in item["articles"]])
+            if confidence >= RANKER_MIN_CONFIDENCE:
+                results[item["symbol"]] = best_idx
+                ranked += 1
+                continue
+        if use_ai:
+            cached_idx = llm_cache.get(_select_cache_key(item["name"], item["articles"], item["change_val"]))
+            if cached_idx is not None and cached_idx < len(item["articles"]):
+                results[item["symbol"]] = None if cached_idx == -1 else cached_idx
+                continue
+        pending.append(item)
+    if ranked:
+        print(f"Article ranker picked {ranked} of {len(items)} movers locally.")
+    
+    if use_ai and pending:
+        try:
+            prompt = (
+                f"다음은 오늘 주가가 크게 움직인 종목들과 각 종목의 뉴스 헤드라인 목록입니다. "
+                f"종목마다 그 변동에 가장 큰 원인이 되었을 것으로 판단되는 기사의 번호(0부터 시작)를 하나씩 골라주세요.\n"
+                f"**핵심 지침:**\n"
+                f"1. **회사 특정적 뉴스 우선**: '실적', '수주', '인수/합병', '신제품', '신고가 경신' 등 해당 회사 자체의 소식을 최우선으로 선택하세요.\n"
+                f"2. **시장/지수 전체 뉴스 배제**: '코스피 상승', '시황 마감', '지수 5000 돌파' 등 시장 전체 흐름을 다루는 뉴스는 해당 회사 전용 뉴스가 있다면 무조건 제외하세요.\n"
+                f"3. 만약 회사와 관련된 뉴스가 하나도 없다면 index를 null로 답해주세요.\n"
+                f"4. **응답 포맷**: 반드시 아래 JSON 배열 형식으로만 응답하세요.\n"
+                f"[{{\"symbol\": \"005930\", \"index\": 0}}, {{\"symbol\": \"AAPL\", \"index\": null}}]\n\n"
+            )
+            for item in pending:
+                direction = "상승" if item["change_val"] >= 0 else "하락"
+                prompt += f"--- 종목코드: {item['symbol']} | 종목명: {item['name']} | {direction} ---\n"
+                prompt += "\n".join([f"{i}: {a['title']}" for i, a in enumerate(item["articles"])]) + "\n\n"
+            
+            with llm_phase():
+                text = gateway.generate(SELECT_MODEL, prompt, timeout=SELECT_TIMEOUT, config={"response_mime_type": "application/json"})
+            if text:
+                import re
+                json_str = re.sub(r'```(?:json)?', '', text).strip()
+                by_symbol = {item["symbol"]: item for item in pending}
+                for entry in json.loads(json_str):
+                    item = by_symbol.get(str(entry.get("symbol")))
+                    if item is None or item["symbol"] in results:
+                        continue
+                    idx = entry.get("index")
+                    if idx is None or str(idx).lower() == "none":
+                        idx = -1
+                    idx = int(idx)
+                    if -1 <= idx < len(item["articles"]):
+                        if gateway.live(): # replay picks are placeholders, never cached
+                            llm_cache.put(_select_cache_key(item["name"], item["articles"], item["change_val"]), idx)
+                        results[item["symbol"]] = None if idx == -1 else idx
+        except Exception as e:
+            print(f"Error selecting articles in batch: {e}")
+    
+    for item in pending:
+        if item["symbol"] not in results:
+            results[item["symbol"]] = _keyword_select(item["name"], item["articles"])
+    return {symbol: None if idx is None else positions[symbol][idx] for symbol, idx in results.items()}
+
+def select_impactful_article(stock_name, articles, change_val):
+    """
+    Use Gemini to select the index of the most impactful article from the list.
+    Strictly prioritizes company-specific events over broad market news.
+    Single-stock form of select_impactful_articles_batch; returns -1 when no news is relevant.
+    """
+    best_idx = select_impactful_articles_batch(
+        [{"symbol": stock_name, "name": stock_name, "articles": articles, "change_val": change_val}]
+    )[stock_name]
+    return -1 if best_idx is None else best_idx
+
+# Batch summary prompt packing
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000")) # per request, stock sections only
+SUMMARY_PARALLELISM = int(os.getenv("SUMMARY_PARALLELISM", "3")) # capped at the gateway's Gemini slots
+SUMMARY_TIMEOUT = 45
+SUMMARY_FALLBACK_MODEL = 'gemini-2.5-flash'
+# Skip the primary model up front when its recent (EWMA) latency is above this
+SUMMARY_LATENCY_BUDGET = float(os.getenv("SUMMARY_LATENCY_BUDGET", "30"))
+SUMMARY_PROMPT_HEADER = (
+    f"당신은 금융 시장을 분석하는 최상급 AI 리포터입니다.\n"
+    f"오늘 주요 주식들의 등락 원인을 분석하고자 합니다. 아래에 여러 종목의 [이름, 등락률, 주요 뉴스] 양식이 나열되어 있습니다.\n\n"
+    f"**[핵심 분석 지시사항 - 반드시 준수할 것]**\n"
+    f"1. **인과 관계 엄격 파악**: 주어진 각 종목의 등락률과 **직접적으로 연결되는 주가 변동의 진짜 원인(호재/악재)**을 뉴스 기사 속에서 찾아내세요.\n"
+    f"2. **시장 노이즈 배제**: '코스피 하락', '시황 마감' 같은 단순 거시경제/시장 전체 동향만을 다루는 가십성 기사는 철저히 무시하고, 종목 특이적(Company-Specific)인 뉴스(실적, 수주, M&A, 신제품 등)에 집중해서 요약하세요.\n"
+    f"3. **무조건 한국어 출력**: 제공된 기사가 영어(미국 주식)이더라도 **반드시 모든 응답을 자연스러운 한국어(Korean)로 번역 및 작성**하세요. summary와 short_reason은 100% 한국어여야 합니다.\n"
+    f"4. **요약(summary)**: 여러 기사의 핵심 내용을 2~3문장의 한국어로 종합하여 요약하세요 (예: ~발표했습니다. ~전망입니다).\n"
+    f"5. **원인 압축(short_reason)**: 요약된 한국어 내용을 바탕으로 핵심 원인을 **2~3개의 명사형 어절**로 완벽히 압축하세요. (예: '영업이익 서프라이즈, 배당 확대', '어닝 쇼크, 투자 심리 위축'). 마침표 금지.\n"
+    f"6. **카테고리(category)**: '실적', '수급', '이슈', '거시경제', '빅테크' 중 하나로 분류하세요.\n"
+    f"7. **응답 포맷**: 반드시 아래 JSON 배열 형식으로만 응답해야 하며, 다른 어떠한 텍스트나 마크다운(```json)도 포함하지 마세요.\n\n"
+    f"[\n"
+    f"  {{\"symbol\": \"AAPL\", \"category\": \"이슈\", \"short_reason\": \"핵심 단어1, 핵심 단어2\", \"summary\": \"규칙을 준수한 자연스러운 한글 요약문입니다.\"}},\n"
+    f"  ...\n"
+    f"]\n\n"
+    f"**[분석할 종목 데이터]**\n"
+)
+
+def estimate_tokens(text):
+    """Rough token count; Korean-heavy prompts run at about two characters per token."""
+    return len(text) // 2 + 1
+
+def pack_prompt_chunks(sections, budget):
+    """
+    Split [(symbol, section_text)] into size-balanced chunks whose estimated tokens stay
+    under `budget` (a single oversized section gets a chunk of its own).
+    Uses longest-first greedy placement into the lightest chunk; each chunk keeps the
+    original section order.
+    """
+    if not sections:
+        return []
+    sizes = [estimate_tokens(text) for _, text in sections]
+    n_chunks = max(1, -(-sum(sizes) // budget))
+    chunks = [[] for _ in range(n_chunks)]
+    loads = [0] * n_chunks
+    for i in sorted(range(len(sections)), key=lambda i: sizes[i], reverse=True):
+        lightest = min(range(len(chunks)), key=lambda c: loads[c])
+        if loads[lightest] and loads[lightest] + sizes[i] > budget:
+            chunks.append([])
+            loads.append(0)
+            lightest = len(chunks) - 1
+        chunks[lightest].append(i)
+        loads[lightest] += sizes[i]
+    return [[sections[i] for i in sorted(chunk)] for chunk in chunks if chunk]
+
+def _summary_stock_body(sd, market="KR"):
+    """Per-stock article/investor lines of the batch summary prompt (best article first, top 5)."""
+    body = ""
+    # Top 5 articles
+    reordered = list(sd["articles"])
+    if 0 <= sd["best_idx"] < len(reordered):
+        best = reordered.pop(sd["best_idx"])
+        reordered.insert(0, best)
+        
+    for i, article in enumerate(reordered[:5]):
+        title = article.get("title", "")
+        content = article.get("content", "")
+        outlets = f" ({article['cluster_size']}개 매체 보도)" if article.get("cluster_size", 1) > 1 else ""
+        body += f"- 기사 {i+1} 제목: {title}{outlets}\n"
+        if content:
+            body += f"  주요 내용: {content[:300]}\n"
+            
+    if market == "KR" and sd.get("investor_data"):
+        inv = sd["investor_data"]
+        body += f"- 오늘 수급 동향 (개인/외국인/기관): {inv.get('개인','-')} / {inv.get('외국인','-')} / {inv.get('기관','-')}\n"
+    return body
+
 def generate_batch_summaries(stock_data_list, market="KR"):
     """
     Batch process all stocks to bypass API rate limits and drastically improve speed.
@@ -498,8 +1178,8 @@ def generate_batch_summaries(stock_data_list, market="KR"):
         ...
     ]
     Returns a dictionary mapping symbol to {"category": "...", "short_reason": "...", "summary": "..."}
+    AI-written entries also carry "ai_generated": True; the rest are rule-based fallbacks.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
     results = {}
     
     # 1. Prepare default fallback logic for all stocks first
@@ -552,96 +1232,110 @@ def generate_batch_summaries(stock_data_list, market="KR"):
             "summary": fallback_text
         }
 
-    # 2. Try Gemini API Batch Request
-    if api_key and api_key != "your_api_key_here" and GENAI_AVAILABLE and stock_data_list:
+    # 2. Reuse cached summaries for stocks whose prompt inputs haven't changed
+    # If running in GitHub Actions (CI=true), use Pro model natively.
+    # If running locally for testing, use Flash model to save quota.
+    is_ci = os.environ.get("CI") == "true"
+    primary_model = 'gemini-2.5-pro' if is_ci else 'gemini-2.5-flash'
+    llm_cache = get_llm_cache()
+    cache_keys = {}
+    pending = []
+    for sd in stock_data_list:
+        cache_keys[sd["symbol"]] = fingerprint(
+            "summary", primary_model, market, sd["symbol"], sd["name"],
+            change_bucket(sd["change_val"]), _summary_stock_body(sd, market)
+        )
+        cached = llm_cache.get(cache_keys[sd["symbol"]])
+        if cached:
+            results[sd["symbol"]] = dict(cached)
+        else:
+            pending.append(sd)
+    if len(pending) < len(stock_data_list):
+        print(f"Reusing cached summaries for {len(stock_data_list) - len(pending)} stocks.")
+    
+    # 3. Try Gemini API Batch Requests: pack stocks into chunks under the token budget and
+    # send them concurrently; a chunk that fails is retried once on its own.
+    gateway = get_llm_gateway()
+    if gateway.available() and pending:
         try:
-            client = genai.Client(api_key=api_key)
-            
-            prompt = (
-                f"당신은 금융 시장을 분석하는 최상급 AI 리포터입니다.\n"
-                f"오늘 주요 주식들의 등락 원인을 분석하고자 합니다. 아래에 여러 종목의 [이름, 등락률, 주요 뉴스] 양식이 나열되어 있습니다.\n\n"
-                f"**[핵심 분석 지시사항 - 반드시 준수할 것]**\n"
-                f"1. **인과 관계 엄격 파악**: 주어진 각 종목의 등락률과 **직접적으로 연결되는 주가 변동의 진짜 원인(호재/악재)**을 뉴스 기사 속에서 찾아내세요.\n"
-                f"2. **시장 노이즈 배제**: '코스피 하락', '시황 마감' 같은 단순 거시경제/시장 전체 동향만을 다루는 가십성 기사는 철저히 무시하고, 종목 특이적(Company-Specific)인 뉴스(실적, 수주, M&A, 신제품 등)에 집중해서 요약하세요.\n"
-                f"3. **무조건 한국어 출력**: 제공된 기사가 영어(미국 주식)이더라도 **반드시 모든 응답을 자연스러운 한국어(Korean)로 번역 및 작성**하세요. summary와 short_reason은 100% 한국어여야 합니다.\n"
-                f"4. **요약(summary)**: 여러 기사의 핵심 내용을 2~3문장의 한국어로 종합하여 요약하세요 (예: ~발표했습니다. ~전망입니다).\n"
-                f"5. **원인 압축(short_reason)**: 요약된 한국어 내용을 바탕으로 핵심 원인을 **2~3개의 명사형 어절**로 완벽히 압축하세요. (예: '영업이익 서프라이즈, 배당 확대', '어닝 쇼크, 투자 심리 위축'). 마침표 금지.\n"
-                f"6. **카테고리(category)**: '실적', '수급', '이슈', '거시경제', '빅테크' 중 하나로 분류하세요.\n"
-                f"7. **응답 포맷**: 반드시 아래 JSON 배열 형식으로만 응답해야 하며, 다른 어떠한 텍스트나 마크다운(```json)도 포함하지 마세요.\n\n"
-                f"[\n"
-                f"  {{\"symbol\": \"AAPL\", \"category\": \"이슈\", \"short_reason\": \"핵심 단어1, 핵심 단어2\", \"summary\": \"규칙을 준수한 자연스러운 한글 요약문입니다.\"}},\n"
-                f"  ...\n"
-                f"]\n\n"
-                f"**[분석할 종목 데이터]**\n"
-            )
-            
-            for sd in stock_data_list:
+            sections = []
+            for sd in pending:
                 direction = "상승" if sd["change_val"] >= 0 else "하락"
-                prompt += f"--- 종목코드: {sd['symbol']} | 종목명: {sd['name']} | 등락: {sd['change_val']}% ({direction}) ---\n"
-                
-                # Top 5 articles
-                reordered = list(sd["articles"])
-                if 0 <= sd["best_idx"] < len(reordered):
-                    best = reordered.pop(sd["best_idx"])
-                    reordered.insert(0, best)
-                    
-                for i, article in enumerate(reordered[:5]):
-                    title = article.get("title", "")
-                    content = article.get("content", "")
-                    prompt += f"- 기사 {i+1} 제목: {title}\n"
-                    if content:
-                        prompt += f"  주요 내용: {content[:300]}\n"
-                        
-                if market == "KR" and sd.get("investor_data"):
-                    inv = sd["investor_data"]
-                    prompt += f"- 오늘 수급 동향 (개인/외국인/기관): {inv.get('개인','-')} / {inv.get('외국인','-')} / {inv.get('기관','-')}\n"
+                section = f"--- 종목코드: {sd['symbol']} | 종목명: {sd['name']} | 등락: {sd['change_val']}% ({direction}) ---\n"
+                section += _summary_stock_body(sd, market)
+                section += "\n"
+                sections.append((sd["symbol"], section))
+            chunks = pack_prompt_chunks(sections, SUMMARY_TOKEN_BUDGET)
+            print(f"Packed {len(sections)} stocks into {len(chunks)} summary request(s).")
                 
-                prompt += "\n"
-                
-            from concurrent.futures import ThreadPoolExecutor, TimeoutError
             import time
             time.sleep(3) # Wait slightly to avoid immediate rate limit if crawled right before
             
-            def call_gemini(model_name):
-                executor = ThreadPoolExecutor(max_workers=1)
-                future = executor.submit(
-                    client.models.generate_content,
-                    model=model_name,
-                    contents=prompt
-                )
-                return future.result(timeout=45)
-
-            try:
-                # If running in GitHub Actions (CI=true), use Pro model natively.
-                # If running locally for testing, use Flash model to save quota.
-                is_ci = os.environ.get("CI") == "true"
-                primary_model = 'gemini-2.5-pro' if is_ci else 'gemini-2.5-flash'
-                
-                response = call_gemini(primary_model)
-            except Exception as e:
-                print(f"{primary_model} failed: {e}. Falling back to gemini-2.5-flash...")
-                if primary_model != 'gemini-2.5-flash':
-                    response = call_gemini('gemini-2.5-flash')
-                else:
-                    response = None
-                
-            if response and response.text:
+            first_result = []
+            results_lock = threading.Lock()
+            
+            def apply_item(item, chunk_symbols):
+                sym = item.get("symbol")
+                if sym not in chunk_symbols:
+                    return None
+                with results_lock:
+                    results[sym]["category"] = item.get("category", "이슈")
+                    results[sym]["short_reason"] = item.get("short_reason", results[sym]["short_reason"])
+                    results[sym]["summary"] = item.get("summary", results[sym]["summary"])
+                    results[sym]["ai_generated"] = True
+                    if not first_result:
+                        first_result.append(time.perf_counter() - started)
+                if gateway.live(): # replay and mock text must not reach a live run
+                    llm_cache.put(cache_keys[sym], results[sym])
+                return sym
+            
+            def summarize_chunk(chunk, model_name):
+                """
+                Stream one chunk, applying each summary object the moment it closes.
+                Returns the part of the chunk that got no summary (empty when complete).
+                """
+                prompt = SUMMARY_PROMPT_HEADER + "".join(section for _, section in chunk)
+                chunk_symbols = {symbol for symbol, _ in chunk}
+                parser = JSONObjectStream()
+                received = set()
                 try:
-                    import json
-                    import re
-                    json_str = re.sub(r'```(?:json)?', '', response.text).strip()
-                    parsed_array = json.loads(json_str)
-                    
-                    for item in parsed_array:
-                        sym = item.get("symbol")
-                        if sym in results:
-                            results[sym]["category"] = item.get("category", "이슈")
-                            results[sym]["short_reason"] = item.get("short_reason", results[sym]["short_reason"])
-                            results[sym]["summary"] = item.get("summary", results[sym]["summary"])
+                    for text in gateway.generate_stream(model_name, prompt, timeout=SUMMARY_TIMEOUT):
+                        for item in parser.feed(text):
+                            sym = apply_item(item, chunk_symbols)
+                            if sym:
+                                received.add(sym)
                 except Exception as e:
-                    print(f"Failed to parse Gemini Batch JSON: {e}, text: {response.text}")
-        except TimeoutError:
-            print(f"Gemini API Batch Request timed out.")
+                    print(f"{model_name} stream failed for chunk {sorted(chunk_symbols)} after {len(received)} summaries: {e}")
+                if parser.dropped:
+                    print(f"{model_name}: skipped {parser.dropped} malformed summary object(s).")
+                return [(symbol, section) for symbol, section in chunk if symbol not in received]
+            
+            def run_chunks(chunk_list, model_name):
+                # Streams beyond the Gemini slots would only sit in the gateway queue
+                with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_PARALLELISM, gateway.slots()))) as pool:
+                    leftovers = list(pool.map(instrumentation.bind(lambda chunk: summarize_chunk(chunk, model_name)), chunk_list))
+                return [rest for rest in leftovers if rest]
+            
+            # One market at a time on the Gemini slots (see llm_phase)
+            with llm_phase():
+                # Pro vs Flash is decided from recent latency and breaker state, not after a timeout
+                models = [primary_model] if primary_model == SUMMARY_FALLBACK_MODEL else [primary_model, SUMMARY_FALLBACK_MODEL]
+                model = gateway.choose_model(models, max_latency=SUMMARY_LATENCY_BUDGET)
+                if model != primary_model:
+                    print(f"{primary_model} is slow or failing recently; summarizing with {model}.")
+                
+                started = time.perf_counter()
+                failed = run_chunks(chunks, model)
+                if failed:
+                    # Leftovers always get one more try: on the other model while it is
+                    # healthy (breaker closed, latency in budget), otherwise on the same one
+                    retry_model = gateway.choose_model([m for m in models if m != model] + [model], max_latency=SUMMARY_LATENCY_BUDGET)
+                    print(f"Retrying {sum(len(chunk) for chunk in failed)} unsummarized stock(s) with {retry_model}...")
+                    failed = run_chunks(failed, retry_model)
+            if first_result:
+                print(f"First summary after {first_result[0]:.1f}s, all done after {time.perf_counter() - started:.1f}s.")
+            if failed:
+                print(f"{sum(len(chunk) for chunk in failed)} stock(s) kept fallback summaries.")
         except Exception as e:
             print(f"Gemini API Batch Request failed: {e}")
             
@@ -654,7 +1348,7 @@ def generate_short_reason(stock_name, articles, change_val, best_idx=0, translat
     
     return "업황 변동, 수급 변화"
 
-def get_related_stocks(symbol, name, date_str, theme=None, market="KR"):
+def get_related_stocks(symbol, name, date_str, theme=None, market="KR", price_cache=None):
     """
     Tiered approach to find related stocks:
     1. Strategic/Industry Peers (Predefined mapping)
@@ -735,51 +1429,227 @@ def get_related_stocks(symbol, name, date_str, theme=None, market="KR"):
 
         final_related.append({
             "name": f"{prefix_tag} {r_name}",
-            "change_rate": f"{get_stock_change(r_symbol, date_str):+.1f}%"
+            "change_rate": f"{_get_change(r_symbol, date_str, market, price_cache):+.1f}%"
         })
     return final_related
 
-def get_last_trading_day(target_date_str=None, market="KR"):
+def _attributed_day(market, kst_now):
     """
-    Find the most recent trading day. 
+    Calendar day whose session a KST moment belongs to.
+    US market attribution logic:
+    Sessions run roughly 23:30 to 06:00 KST.
+    If we crawl at 3 AM KST on the 26th, it's actually the 25th session.
+    """
+    if market == "US" and kst_now.hour < 9:
+        return kst_now - timedelta(days=1)
+    return kst_now
+
+def _session_date(market="KR", target_date_str=None):
+    """
+    Weekday-adjusted session date for a market, before any holiday check.
     For US market, if it's currently early morning KST (before 9 AM), 
     the 'current' active or recently closed session is from 'yesterday'.
     """
-    kst_now = datetime.datetime.utcnow() + timedelta(hours=9)
-    
     if target_date_str is None:
-        target_date = kst_now
-        # US market attribution logic:
-        # Sessions run roughly 23:30 to 06:00 KST.
-        # If we crawl at 3 AM KST on the 26th, it's actually the 25th session.
-        if market == "US" and kst_now.hour < 9:
-            target_date = kst_now - timedelta(days=1)
+        target_date = _attributed_day(market, _kst_now())
     else:
         target_date = datetime.datetime.strptime(target_date_str, "%Y-%m-%d")
     
-    # Simple weekday check if market data check fails
     base_date = target_date
     while base_date.weekday() > 4: # Sat=5, Sun=6
         base_date -= timedelta(days=1)
+    return base_date
+
+def get_last_trading_day(target_date_str=None, market="KR"):
+    """
+    Find the most recent trading day. 
+    See _session_date for the US session attribution rule.
+    """
+    # Simple weekday check if market data check fails
+    base_date = _session_date(market, target_date_str)
+    base_str = base_date.strftime("%Y-%m-%d")
+    symbol = 'KS11' if market == "KR" else 'IXIC'
+    store = get_price_store(market)
+    final_before = _session_final_before(market)
+    
+    # 1. Closed sessions: the stored index bars already hold the trading calendar,
+    # unless a gap in the store covers base_str
+    last_stored = store.last_date(symbol)
+    if base_str < final_before and last_stored and last_stored >= base_str:
+        stored_day = store.latest_on_or_before(symbol, base_str)
+        if stored_day:
+            return stored_day
+    
+    # 2. Current session: the market snapshot (reused by get_top_movers) carries the trade date
+    if target_date_str is None:
+        try:
+            stocks_list = US_MAJOR_STOCKS if market == "US" else MAJOR_STOCKS
+            snapshot = get_market_snapshot(market, symbols=[s['symbol'] for s in stocks_list])
+            traded = [q["traded_at"] for q in snapshot.values() if q["traded_at"] and q["traded_at"] <= base_str]
+            if traded:
+                return max(traded)
+        except Exception as e:
+            print(f"Error reading trade date from {market} snapshot: {e}")
         
     # Optional: Verify with fdr (can be flaky/slow, so use as secondary)
     try:
-        symbol = 'KS11' if market == "KR" else 'IXIC'
         start_search = base_date - timedelta(days=5)
-        df = fdr.DataReader(symbol, start_search.strftime("%Y-%m-%d"), base_date.strftime("%Y-%m-%d"))
+        df = _fdr_data_reader(symbol, start_search.strftime("%Y-%m-%d"), base_str)
+        store.append(symbol, _df_to_bars(df), final_before=final_before)
         if not df.empty: 
             return df.index[-1].strftime("%Y-%m-%d")
     except:
         pass
         
-    return base_date.strftime("%Y-%m-%d")
+    return base_str
+
+def _summary_key(sd):
+    """Fingerprint of what a summary was generated from: the merged article set and change bucket."""
+    return fingerprint("signal", sorted(a["url"] for a in sd["articles"]), change_bucket(sd["change_val"]))
+
+def _collect_stock_news(idx, stock, date_str, market, existing_signals, news_index=None):
+    """
+    First per-mover network stage: news headlines, merged with the ones already stored today.
+    With a market news index, headlines come from it and the per-symbol crawl is only the fallback.
+    """
+    symbol = stock['symbol']
+    name = stock['name']
+    
+    # 2. News Headlines
+    new_articles = news_index.get(symbol) if news_index else None
+    if new_articles:
+        new_articles = [dict(a) for a in new_articles]
+    elif market == "US":
+        new_articles = scrape_us_news(symbol, name, date_str)
+    else:
+        new_articles = scrape_naver_news(symbol, name, date_str)
+        
+    # Merge new articles with existing ones (avoiding duplicates)
+    articles = []
+    seen_urls = set()
+    for a in new_articles:
+        if a['url'] not in seen_urls:
+            articles.append(a)
+            seen_urls.add(a['url'])
+            
+    if symbol in existing_signals:
+        for a in existing_signals[symbol].get('news_articles', []):
+            if a['url'] not in seen_urls:
+                articles.append(a)
+                seen_urls.add(a['url'])
+    
+    return {
+        "idx": idx,
+        "symbol": symbol,
+        "name": name,
+        "change_val": stock['change'],
+        "articles": articles,
+        "best_idx": 0,
+        "investor_data": None,
+        "change_rate": stock['change_rate'] # Keep for final assembly
+    }
+
+def _complete_stock_data(sd, best_idx, date_str, market):
+    """
+    Second per-mover network stage, after batch selection: body of the selected article
+    (KR) and the investor table. Moves the selected article to the top of the list.
+    """
+    articles = sd["articles"]
+    name = sd["name"]
+    
+    # 3. Scrape Impactful News
+    if articles and best_idx is not None and 0 <= best_idx < len(articles):
+        target_article = articles.pop(best_idx)
+        print(f"Selected impactful news for {name}: {target_article['title']}")
+        if market == "KR" and not is_placeholder(target_article): # We only scrape deep content for KR right now
+            if 'content' not in target_article or not target_article['content']:
+                target_article['content'] = scrape_article_content(target_article['url'])
+        # Put the best article at the top of the list so UI uses it easily
+        articles.insert(0, target_article)
+    else:
+        print(f"No sufficiently impactful/relevant news found for {name}.")
+    sd["best_idx"] = 0
+    
+    # 4. Fetch Additional Data
+    if market == "KR":
+        try:
+            sd["investor_data"] = get_investor_data(sd["symbol"], date_str)
+        except Exception as e:
+            print(f"Error fetching investor data: {e}")
+            
+    # Store for batch processing
+    return sd
+
+def generate_daily_json(date_str=None, market="KR", workers=None, news_mode=None, profile=False, stage_overrides=None,
+                        resume=False, run_id=None):
+    """
+    Build (or update) the day file for `market`, and write a run report next to it
+    ({prefix}{date}.run.json): wall/CPU per stage, HTTP/LLM/FDR spans and counters.
+    profile=True also runs cProfile (pstats saved as {prefix}{date}.prof) and tracemalloc.
+    Stage results are checkpointed under data/checkpoints/ while the run is in progress;
+    resume=True picks up the latest recent checkpoint of (market, date) (or the one of
+    `run_id`) and skips the stages and symbols it already holds.
+    """
+    with instrumentation.run(market, date_str) as recorder:
+        if date_str is None:
+            with instrumentation.stage("trading_day"):
+                date_str = get_last_trading_day(market=market)
+            recorder.date_str = date_str
+        prefix = "us_" if market == "US" else ""
+        report_path = os.path.join(DATA_DIR, f"{prefix}{date_str}.run.json")
+        profiler = instrumentation.profiled(os.path.join(DATA_DIR, f"{prefix}{date_str}.prof")) if profile else contextlib.nullcontext()
+        profile_result = None
+        try:
+            with profiler as profile_result:
+                checkpoint = open_checkpoint(market, date_str, resume=resume, run_id=run_id)
+                _build_daily_json(date_str, market, workers, news_mode, stage_overrides, checkpoint)
+                checkpoint.finish()
+        finally:
+            if profile_result is not None:
+                recorder.extra["profile"] = profile_result
+            instrumentation.write_report(recorder, report_path)
+            print(f"Run report: {report_path} ({recorder.report()['wall']:.1f}s)")
+    return True
 
-def generate_daily_json(date_str=None, market="KR"):
-    if date_str is None: 
-        date_str = get_last_trading_day(market=market)
+def open_checkpoint(market, date_str, resume=False, run_id=None):
+    """
+    Checkpoint for this run. With resume, the one of `run_id` or else the latest recent
+    one of (market, date); otherwise (or if there is none) a fresh one named after
+    GITHUB_RUN_ID or the start time. Expired checkpoints of the market are removed.
+    """
+    root = os.path.join(DATA_DIR, "checkpoints")
+    checkpoint = None
+    if resume:
+        if run_id:
+            checkpoint = RunCheckpoint(root, market, date_str, run_id)
+            if not os.path.isdir(checkpoint.path):
+                print(f"No checkpoint for run {run_id}; starting fresh.")
+        else:
+            checkpoint = RunCheckpoint.latest(root, market, date_str)
+        if checkpoint is not None and os.path.isdir(checkpoint.path):
+            print(f"Resuming from checkpoint {checkpoint.path}")
+    if checkpoint is None:
+        run_id = run_id or os.getenv("GITHUB_RUN_ID") or _kst_now().strftime("%H%M%S")
+        checkpoint = RunCheckpoint(root, market, date_str, run_id)
+    RunCheckpoint.prune(root, market, keep=checkpoint.path)
+    return checkpoint
+
+def _checkpointed(checkpoint, stage, fn):
+    """Per-symbol stage function that skips symbols the checkpoint already finished and records new ones."""
+    done = checkpoint.symbols(stage)
+    def run(item):
+        symbol = item['symbol']
+        if symbol in done:
+            return done[symbol]
+        result = fn(item)
+        checkpoint.put_symbol(stage, symbol, result)
+        return result
+    return run
+
+def _build_daily_json(date_str, market, workers, news_mode, stage_overrides, checkpoint):
     print(f"Generating data for {date_str} ({market} market)...")
     
-    kst_now = datetime.datetime.utcnow() + timedelta(hours=9)
+    kst_now = _kst_now()
     
     prefix = "us_" if market == "US" else ""
     output_file = os.path.join(DATA_DIR, f"{prefix}{date_str}.json")
@@ -795,75 +1665,142 @@ def generate_daily_json(date_str=None, market="KR"):
             
     existing_signals = {s['main_stock']['symbol']: s for s in existing_data.get('signals', [])}
     
-    # 1. Get real movers
-    movers = get_top_movers(date_str, market=market)
+    # Shared by mover ranking and related stocks so no price is fetched twice in a run
+    price_cache = PriceCache()
+    workers = stage_workers(workers, stage_overrides)
+    news_mode = news_mode or DEFAULT_NEWS_MODE
     
-    # [MODIFIED] Collect all stock data for batch summary instead of calling API iteratively
-    stock_data_collection = []
+    # Pipeline: movers are released by the price stage as soon as their rank is certain and
+    # fan out to news and related-stock pricing. Clustering and the batched selection need
+    # every mover's headlines, so they are the one barrier; related stocks keep pricing in
+    # the background through the completion stage and the LLM summary call.
+    pipe = Pipeline(market)
+    news_in, related_in = Channel(), Channel()
+    collected, related_out = Channel(), Channel()
+    movers = []
     
-    for idx, stock in enumerate(movers):
-        symbol = stock['symbol']
-        name = stock['name']
-        change_val = stock['change']
-        
-        # 2. News Headlines
-        if market == "US":
-            new_articles = scrape_us_news(symbol, name, date_str)
-        else:
-            new_articles = scrape_naver_news(symbol, name, date_str)
-            
-        # Merge new articles with existing ones (avoiding duplicates)
-        articles = []
-        seen_urls = set()
-        for a in new_articles:
-            if a['url'] not in seen_urls:
-                articles.append(a)
-                seen_urls.add(a['url'])
-                
-        if symbol in existing_signals:
-            for a in existing_signals[symbol].get('news_articles', []):
-                if a['url'] not in seen_urls:
-                    articles.append(a)
-                    seen_urls.add(a['url'])
-        
-        # 3. Select and Scrape Impactful News
-        best_idx = select_impactful_article(name, articles, change_val)
-        if articles and best_idx != -1 and 0 <= best_idx < len(articles):
-            target_article = articles.pop(best_idx)
-            print(f"Selected impactful news for {name}: {target_article['title']}")
-            if market == "KR": # We only scrape deep content for KR right now
-                if 'content' not in target_article or not target_article['content']:
-                    target_article['content'] = scrape_article_content(target_article['url'])
-            # Put the best article at the top of the list so UI uses it easily
-            articles.insert(0, target_article)
-            best_idx = 0 
-        else:
-            print(f"No sufficiently impactful/relevant news found for {name}.")
-            best_idx = 0
-        
-        # 4. Fetch Additional Data
-        investor_data = None
-        if market == "KR":
+    news_index = None
+    news_index_ready = threading.Event()
+    news_index_ready.set()
+    if news_mode == "market" and market == "KR":
+        news_index_ready.clear()
+        def market_news(emit):
+            nonlocal news_index
             try:
-                investor_data = get_investor_data(symbol, date_str)
-            except Exception as e:
-                print(f"Error fetching investor data: {e}")
-                
-        # Store for batch processing
-        stock_data_collection.append({
-            "idx": idx,
-            "symbol": symbol,
-            "name": name,
-            "change_val": change_val,
-            "articles": articles,
-            "best_idx": best_idx,
-            "investor_data": investor_data,
-            "change_rate": stock['change_rate'] # Keep for final assembly
-        })
+                news_index = checkpoint.get_stage("market_news")
+                if news_index is None:
+                    news_index = build_market_news_index(date_str, market=market)
+                    checkpoint.put_stage("market_news", news_index)
+            finally:
+                news_index_ready.set()
+        pipe.source("market_news", market_news)
+    
+    # 1. Get real movers
+    def price_movers(emit):
+        saved = checkpoint.get_stage("movers")
+        if saved is not None:
+            for symbol, day, change in saved["prices"]:
+                price_cache.put(symbol, day, change)
+            for mover in saved["movers"]:
+                movers.append(mover)
+                emit(mover)
+            return
+        for mover in iter_top_movers(date_str, market=market, price_cache=price_cache, workers=workers["price"]):
+            movers.append(mover)
+            emit(mover)
+        checkpoint.put_stage("movers", {"movers": movers, "prices": price_cache.items()})
+    
+    def collect_news(stock):
+        news_index_ready.wait()
+        return _collect_stock_news(None, stock, date_str, market, existing_signals, news_index=news_index)
+    
+    def related_for(stock):
+        stock_info = STOCK_METADATA.get(market, {}).get(stock['symbol'], {})
+        industry_list = stock_info.get("industry", [])
+        theme = f"#{industry_list[0]}" if industry_list else ""
+        related = get_related_stocks(stock['symbol'], stock['name'], date_str, theme=theme, market=market, price_cache=price_cache)
+        return stock['symbol'], related
+    
+    print(f"Pipeline workers: {workers}")
+    pipe.source("price", price_movers, news_in, related_in)
+    pipe.stage("news", _checkpointed(checkpoint, "news", collect_news), news_in, collected, workers=workers["news"])
+    pipe.stage("related", _checkpointed(checkpoint, "related", related_for), related_in, related_out, workers=workers["related"])
+    collected_items = pipe.sink(collected)
+    related_items = pipe.sink(related_out)
+    
+    # Mover order (not arrival order) sets the sig_{date}_{market}_{idx} ids and the
+    # clustering order, so both stay deterministic.
+    stock_data_collection = collected_items()
+    rank = {m['symbol']: i for i, m in enumerate(sorted(movers, key=_mover_rank))}
+    stock_data_collection.sort(key=lambda sd: rank[sd['symbol']])
+    for i, sd in enumerate(stock_data_collection):
+        sd["idx"] = i
+    
+    # Collapse the same story from several outlets (and across movers) into one article.
+    # Every headline is indexed first, in mover order, so representatives are deterministic.
+    with instrumentation.stage("cluster"):
+        clusters = HeadlineClusters()
+        for sd in stock_data_collection:
+            for article in sd["articles"]:
+                clusters.assign(article, sd["name"])
+        total_articles = sum(len(sd["articles"]) for sd in stock_data_collection)
+        for sd in stock_data_collection:
+            sd["articles"] = clusters.collapse(sd["articles"], sd["name"])
+    print(f"Headline clusters: {sum(len(sd['articles']) for sd in stock_data_collection)} stories from {total_articles} articles.")
+    
+    # 3. Select the impactful article for every mover in one batched request
+    with instrumentation.stage("select"):
+        selections = checkpoint.get_stage("select")
+        if selections is None:
+            selections = select_impactful_articles_batch(stock_data_collection)
+            checkpoint.put_stage("select", selections)
+    
+    def complete(sd):
+        return _complete_stock_data(sd, selections.get(sd["symbol"]), date_str, market)
+    
+    complete_in, completed = Channel(), Channel()
+    pipe.stage("complete", _checkpointed(checkpoint, "complete", complete), complete_in, completed, workers=workers["complete"])
+    completed_items = pipe.sink(completed)
+    for sd in stock_data_collection:
+        complete_in.put(sd)
+    complete_in.close()
+    stock_data_collection = sorted(completed_items(), key=lambda sd: sd["idx"])
         
     # --- BATCH AI SUMMARIZATION ---
-    print(f"Sending batch summary request for {len(stock_data_collection)} stocks...")
-    batch_summaries = generate_batch_summaries(stock_data_collection, market=market)
+    # Only stocks whose merged articles or change bucket moved since their stored AI summary are re-sent
+    to_summarize = []
+    reused_summaries = {}
+    # Replay and mock summaries are left unkeyed, so a live run always rewrites them
+    live_llm = get_llm_gateway().live()
+    for sd in stock_data_collection:
+        sd["summary_key"] = _summary_key(sd) if live_llm else None
+        previous = existing_signals.get(sd["symbol"])
+        if sd["summary_key"] and previous and previous.get("summary_key") == sd["summary_key"] and previous.get("summary"):
+            reused_summaries[sd["symbol"]] = {
+                "category": previous.get("signal_type", "이슈"),
+                "short_reason": previous.get("short_reason", "업황 변화"),
+                "summary": previous["summary"],
+                "ai_generated": True
+            }
+        else:
+            to_summarize.append(sd)
+    if reused_summaries:
+        print(f"Keeping stored summaries for {len(reused_summaries)} unchanged stocks.")
+    
+    batch_summaries = {}
+    if to_summarize:
+        print(f"Sending batch summary request for {len(to_summarize)} stocks...")
+        with instrumentation.stage("summary"):
+            batch_summaries = checkpoint.get_stage("summary")
+            if batch_summaries is None:
+                batch_summaries = generate_batch_summaries(to_summarize, market=market)
+                checkpoint.put_stage("summary", batch_summaries)
+    batch_summaries.update(reused_summaries)
+    
+    related_by_symbol = dict(related_items())
+    pipe.join()
+    instrumentation.note("pipeline", pipe.report())
+    instrumentation.note("checkpoint", {"run_id": checkpoint.run_id, "resumed": checkpoint.resumed})
     
     # 5. Assemble Final Signals
     signals = []
@@ -877,8 +1814,8 @@ def generate_daily_json(date_str=None, market="KR"):
         industry_list = stock_info.get("industry", [])
         theme = f"#{industry_list[0]}" if industry_list else ""
             
-        # Related Stocks
-        related = get_related_stocks(symbol, name, date_str, theme=theme, market=market)
+        # Related Stocks (priced by the pipeline's related stage)
+        related = related_by_symbol.get(symbol, [])
         
         # Retrieve Summary
         summary_obj = batch_summaries.get(symbol, {
@@ -903,20 +1840,108 @@ def generate_daily_json(date_str=None, market="KR"):
             "related_stocks": related,
             "timestamp": kst_now.strftime("%Y-%m-%d %H:%M:%S")
         }
+        # Fallback text is not keyed, so the next run retries the AI summary
+        if summary_obj.get("ai_generated") and sd["summary_key"]:
+            signal_data["summary_key"] = sd["summary_key"]
         signals.append(signal_data)
 
-    output_data = {"last_updated": kst_now.strftime("%Y-%m-%d %H:%M:%S"), "signals": signals}
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-    return True
+    print(f"Price cache: {price_cache.stats()}")
+    # The article and LLM caches are process-wide (the service, --market all); their
+    # lookups are counted per run so these figures cover this market's run only
+    recorder = instrumentation.current_run()
+    counters = recorder.report()["counters"] if recorder else {}
+    article_stats = {"hits": counters.get("article_cache.hits", 0), "misses": counters.get("article_cache.misses", 0)}
+    llm_stats = {"hits": counters.get("llm_cache.hits", 0), "misses": counters.get("llm_cache.misses", 0)}
+    print(f"Article cache: {article_stats['hits']} hits / {article_stats['misses']} misses")
+    print(f"LLM cache: {llm_stats['hits']} hits / {llm_stats['misses']} misses")
+    gateway = get_llm_gateway()
+    if gateway.available():
+        print(f"LLM models: {gateway.stats()}")
+    instrumentation.note("caches", {
+        "price": {"hits": price_cache.hits, "misses": price_cache.misses},
+        "article": article_stats,
+        "llm": llm_stats,
+    })
+    instrumentation.note("models", gateway.stats())
+    
+    with instrumentation.stage("save"):
+        get_news_watermarks().save()
+        get_llm_cache().save()
+        gateway.save()
+        output_data = {"last_updated": kst_now.strftime("%Y-%m-%d %H:%M:%S"), "signals": signals}
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+MARKETS = ("KR", "US")
+
+def parse_markets(value):
+    """"KR", "KR,US" or "all" -> list of markets, in MARKETS order."""
+    if value.strip().lower() == "all":
+        return list(MARKETS)
+    markets = {m.strip().upper() for m in value.split(",") if m.strip()}
+    unknown = markets - set(MARKETS)
+    if unknown or not markets:
+        raise ValueError(f"Unknown market(s): {', '.join(sorted(unknown)) or value!r} (use {', '.join(MARKETS)} or all)")
+    return [m for m in MARKETS if m in markets]
+
+def generate_markets(markets, date_str=None, **kwargs):
+    """
+    generate_daily_json for several markets at once, one thread per market. They share
+    this process's HTTP sessions, caches and LLM gateway (their Gemini phases take turns,
+    see llm_phase), while output, run report and checkpoint stay per market. Each market resolves its own trading day when date_str
+    is None. Returns {market: True or the exception that stopped it}; one market failing
+    doesn't stop the others.
+    """
+    results = {}
+    
+    def run(market):
+        try:
+            results[market] = generate_daily_json(date_str, market=market, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            results[market] = e
+    
+    if len(markets) == 1:
+        run(markets[0])
+        return results
+    threads = [threading.Thread(target=run, args=(market,), name=f"crawl-{market}") for market in markets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Toss Signal Crawler")
     parser.add_argument("--date", type=str, default=None, help="Target date YYYY-MM-DD")
-    parser.add_argument("--market", type=str, choices=["KR", "US"], default="KR", help="Market to crawl (KR or US)")
+    parser.add_argument("--market", type=str, default="KR", help="Market(s) to crawl: KR, US, KR,US or all (concurrently in one process)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Threads per pipeline stage (1 = one mover at a time)")
+    parser.add_argument("--stage-workers", type=str, default="", help="Per-stage threads, e.g. price=8,news=4,complete=4,related=2")
+    parser.add_argument("--news-mode", type=str, choices=["symbol", "market"], default=DEFAULT_NEWS_MODE, help="Per-symbol news crawl, or one market-wide crawl fanned out to symbols (KR only)")
+    parser.add_argument("--profile", action="store_true", help="Also run cProfile and tracemalloc; results go next to the run report")
+    parser.add_argument("--resume", action="store_true", help="Continue the latest interrupted run of this market and date from its checkpoint")
+    parser.add_argument("--run-id", type=str, default=None, help="Checkpoint run id (default: GITHUB_RUN_ID or start time); with --resume, the run to continue")
+    parser.add_argument("--data-dir", type=str, default=None, help="Data directory (default: data/, or a temporary copy when LLM_BACKEND=replay or GEMINI_BASE_URL is set)")
     args = parser.parse_args()
+    if args.data_dir:
+        use_data_dir(args.data_dir)
+    elif not get_llm_gateway().live():
+        real_dir = DATA_DIR
+        print(f"Offline LLM backend: writing to {use_scratch_data_dir()} instead of {real_dir}")
+    try:
+        markets = parse_markets(args.market)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile and len(markets) > 1:
+        parser.error("--profile traces one market at a time")
     
-    target_day = args.date if args.date else get_last_trading_day()
-    generate_daily_json(target_day, market=args.market)
+    stage_overrides = dict(item.split("=", 1) for item in args.stage_workers.split(",") if "=" in item)
+    results = generate_markets(markets, args.date, workers=args.workers, news_mode=args.news_mode, profile=args.profile,
+                               stage_overrides=stage_overrides, resume=args.resume, run_id=args.run_id)
+    get_llm_gateway().shutdown()
+    failed = [market for market, result in results.items() if result is not True]
+    if failed:
+        print(f"Failed market(s): {', '.join(failed)}")
+        raise SystemExit(1)
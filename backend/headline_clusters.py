@@ -0,0 +1,172 @@
+import re
+import hashlib
+import threading
+
+SIMHASH_BITS = 64
+SHINGLE_LEN = 3
+# Hamming distance below which two headlines about the same stock are candidates for one
+# story. The stock name is masked before hashing and a candidate must also share
+# MIN_JACCARD of its shingles, because templated titles about different stocks
+# ("삼성전자 …" vs "LG전자 …") can sit only a few bits apart; headlines filed under
+# different stocks only merge on identical text.
+MAX_DISTANCE = 9
+MIN_JACCARD = 0.5
+NAME_MASK = "§"
+MIN_FUZZY_LEN = 10 # shorter normalized headlines only merge on exact text
+MIN_PREFIX_LEN = 12 # truncated headlines shorter than this are too generic to prefix-match
+
+_TRUNCATION = re.compile(r"(\.\.\.|…)\s*$")
+_NOISE = re.compile(r"[\s\W_]+")
+
+def normalize_headline(title):
+    """(normalized text, truncated?) — punctuation, spacing and case stripped."""
+    truncated = bool(_TRUNCATION.search(title))
+    text = _TRUNCATION.sub("", title)
+    return _NOISE.sub("", text).lower(), truncated
+
+def mask_name(text, name):
+    """Normalized headline with the (normalized) stock name replaced by NAME_MASK."""
+    key = normalize_headline(name)[0] if name else ""
+    return text.replace(key, NAME_MASK) if key else text
+
+def shingles(text):
+    if len(text) <= SHINGLE_LEN:
+        return [text]
+    return [text[i:i + SHINGLE_LEN] for i in range(len(text) - SHINGLE_LEN + 1)]
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def is_placeholder(article):
+    """The generic "{name}, 시장 흐름 …" / "{name} Market Analysis" stand-in for an empty news list."""
+    if article.get("placeholder"):
+        return True
+    # Day files written before the flag existed
+    title, url = article.get("title", ""), article.get("url", "")
+    return ((title.endswith(", 시장 흐름 및 관련 테마 분석") and "/item/news.naver" in url)
+            or (title.endswith(" Market Analysis") and "finance.yahoo.com/quote/" in url))
+
+def simhash(text):
+    """64-bit SimHash over character shingles (Korean headlines don't space reliably)."""
+    bits = [format(int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+            for shingle in shingles(text)]
+    # Majority vote per bit position
+    majority = "".join("1" if column.count("1") * 2 > len(bits) else "0" for column in zip(*bits))
+    return int(majority, 2)
+
+class HeadlineClusters:
+    """
+    Run-scoped near-duplicate index of headlines, shared by every symbol of a run so the
+    same story syndicated by several outlets always maps to the same cluster and the same
+    representative article. An identical headline filed under several stocks shares one
+    cluster; rewrites only merge within the stock they were filed under, after the stock
+    name is masked, so "{name} …" templates never join across stocks.
+    A run holds a few hundred stories, so candidates are a linear popcount scan over the
+    cluster hashes, confirmed by shingle Jaccard; a headline cut off with "..." also joins
+    a cluster of the same stock whose headline starts with it.
+    Placeholder articles are never clustered.
+    """
+    def __init__(self, max_distance=MAX_DISTANCE, min_jaccard=MIN_JACCARD):
+        self.max_distance = max_distance
+        self.min_jaccard = min_jaccard
+        self._lock = threading.Lock()
+        self._hashes = [] # cluster id -> simhash of its first (masked) headline
+        self._texts = [] # cluster id -> normalized, masked first headline
+        self._shingles = [] # cluster id -> shingle set of that headline
+        self._names = [] # cluster id -> normalized stock name it was filed under (None: placeholder)
+        self._representatives = [] # cluster id -> article dict
+        self._exact = {}
+        self._placeholders = {} # id(article) -> its own cluster
+
+    def _find(self, name, text, masked, value, truncated):
+        cluster_id = self._exact.get(text)
+        if cluster_id is not None:
+            return cluster_id
+        if len(masked) >= MIN_FUZZY_LEN:
+            grams = None
+            for candidate, other in enumerate(self._hashes):
+                if (self._names[candidate] == name and bin(value ^ other).count("1") <= self.max_distance
+                        and len(self._texts[candidate]) >= MIN_FUZZY_LEN):
+                    grams = grams or set(shingles(masked))
+                    if jaccard(grams, self._shingles[candidate]) >= self.min_jaccard:
+                        return candidate
+        if truncated and len(masked) >= MIN_PREFIX_LEN:
+            for candidate, other in enumerate(self._texts):
+                if self._names[candidate] == name and other.startswith(masked):
+                    return candidate
+        return None
+
+    def _open(self, name, masked, value, article):
+        self._hashes.append(value)
+        self._texts.append(masked)
+        self._shingles.append(set(shingles(masked)))
+        self._names.append(name)
+        self._representatives.append(article)
+        return len(self._hashes) - 1
+
+    def assign(self, article, name=None):
+        """
+        Cluster id of the article's headline, opening a new cluster if it's a new story.
+        `name` is the stock the article was filed under.
+        """
+        text, truncated = normalize_headline(article.get("title", ""))
+        if is_placeholder(article):
+            with self._lock: # a cluster of its own, never matched
+                cluster_id = self._placeholders.get(id(article))
+                if cluster_id is None:
+                    cluster_id = self._open(None, text, simhash(text), article)
+                    self._placeholders[id(article)] = cluster_id
+                return cluster_id
+        key = normalize_headline(name)[0] if name else ""
+        masked = mask_name(text, name)
+        value = simhash(masked)
+        with self._lock:
+            cluster_id = self._find(key, text, masked, value, truncated)
+            if cluster_id is None:
+                cluster_id = self._open(key, masked, value, article)
+            elif _better_representative(article, self._representatives[cluster_id]):
+                self._representatives[cluster_id] = article
+            self._exact.setdefault(text, cluster_id)
+            return cluster_id
+
+    def collapse(self, articles, name=None):
+        """
+        One article per story, in first-seen order, with "cluster_size" = outlets carrying it.
+        The representative is the run-wide best copy of the story (full headline, body
+        already scraped) so every symbol points at the same URL.
+        Sizes stored by an earlier run are kept when larger, so re-merging a day never
+        double counts.
+        """
+        groups = {}
+        order = []
+        for article in articles:
+            cluster_id = self.assign(article, name)
+            if cluster_id not in groups:
+                groups[cluster_id] = []
+                order.append(cluster_id)
+            groups[cluster_id].append(article)
+
+        collapsed = []
+        for cluster_id in order:
+            members = groups[cluster_id]
+            with self._lock:
+                merged = dict(self._representatives[cluster_id])
+            merged["cluster_size"] = max(len(members), max(m.get("cluster_size", 1) for m in members))
+            if not merged.get("content"):
+                content = next((m["content"] for m in members if m.get("content")), None)
+                if content:
+                    merged["content"] = content
+            if any("has_name" in m for m in members): # per-symbol flag (US lists)
+                merged["has_name"] = any(m.get("has_name") for m in members)
+            collapsed.append(merged)
+        return collapsed
+
+    def stats(self):
+        return {"clusters": len(self._hashes), "headlines": len(self._exact)}
+
+def _representative_rank(article):
+    _, truncated = normalize_headline(article.get("title", ""))
+    return (truncated, not article.get("content"), -len(article.get("title", "")))
+
+def _better_representative(article, current):
+    return _representative_rank(article) < _representative_rank(current)
@@ -0,0 +1,53 @@
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Parsing backend for list pages and article bodies.
+# lxml (C) is used when installed; CRAWLER_HTML_PARSER=html.parser forces the old pure-Python path.
+try:
+    import lxml # noqa: F401
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+PARSER = os.getenv("CRAWLER_HTML_PARSER", DEFAULT_PARSER)
+
+def has_class(name):
+    """
+    class_ matcher for a strainer. A plain string is compared with the whole class
+    attribute while parsing, so <table class="type5 wide"> would be dropped.
+    """
+    return lambda value: value is not None and name in value.split()
+
+# Only the subtrees the crawler reads are built into the tree
+NEWS_LIST = SoupStrainer("table", class_=has_class("type5"))
+MARKET_NEWS_LIST = SoupStrainer("ul", class_=has_class("realtimeNewsList"))
+INVESTOR_TABLE = SoupStrainer("table", class_=has_class("type2"))
+ARTICLE_BODY = SoupStrainer(id=["dic_area", "newsct_article", "articleBodyContents"])
+
+def make_soup(html, parse_only=None):
+    """
+    Parse `html`, restricted to the `parse_only` strainer when given.
+    If the restricted parse finds nothing (layout change, odd markup), the full page is
+    parsed with html.parser exactly as before.
+    """
+    if parse_only is not None:
+        soup = BeautifulSoup(html, PARSER, parse_only=parse_only)
+        if soup.find(True) is not None:
+            return soup
+    return BeautifulSoup(html, 'html.parser')
+
+def text_prefix(node, limit, separator='\n'):
+    """
+    Same result as node.get_text(strip=True, separator=separator)[:limit], but stops
+    walking the tree once `limit` characters have been collected.
+    """
+    parts = []
+    length = 0
+    for text in node.stripped_strings:
+        if parts:
+            length += len(separator)
+        parts.append(text)
+        length += len(text)
+        if length >= limit:
+            break
+    return separator.join(parts)[:limit]
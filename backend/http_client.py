@@ -0,0 +1,338 @@
+import os
+import gzip
+import json
+import atexit
+import base64
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    from backend import instrumentation
+except ImportError: # Executed as `python backend/crawler.py`
+    import instrumentation
+
+# Shared HTTP layer for the crawler and the dashboard.
+# One pooled Session per host (keep-alive, TLS reuse), a token bucket per host,
+# a cap on in-flight requests per host, default timeouts and jittered retries.
+# A Cassette can record every response once and replay it offline (benchmarks, tests).
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5 # seconds, doubled per attempt
+BACKOFF_MAX = 8.0
+
+# host -> (requests per second, burst)
+HOST_RATE_LIMITS = {
+    "finance.naver.com": (5.0, 10),
+    "n.news.naver.com": (5.0, 10),
+    "m.stock.naver.com": (5.0, 10),
+    "api.stock.naver.com": (5.0, 10),
+    "feeds.finance.yahoo.com": (2.0, 4),
+}
+DEFAULT_RATE_LIMIT = (5.0, 10)
+
+# host -> max in-flight requests
+HOST_CONCURRENCY = {
+    "finance.naver.com": 4,
+    "n.news.naver.com": 4,
+    "feeds.finance.yahoo.com": 4,
+    "generativelanguage.googleapis.com": 2,
+}
+DEFAULT_HOST_CONCURRENCY = 4
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_lock = threading.Lock()
+_sessions = {}
+_buckets = {}
+_semaphores = {}
+_stats = {}
+
+def _host(url_or_host):
+    return urlparse(url_or_host).netloc or url_or_host
+
+def _get_or_create(registry, host, factory):
+    with _lock:
+        item = registry.get(host)
+        if item is None:
+            item = factory()
+            registry[host] = item
+        return item
+
+def get_session(host):
+    """Long-lived Session for a host; its connection pool matches the host's concurrency cap."""
+    def factory():
+        session = requests.Session()
+        size = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        return session
+    return _get_or_create(_sessions, host, factory)
+
+def _bucket(host):
+    rate, burst = HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+    return _get_or_create(_buckets, host, lambda: TokenBucket(rate, burst))
+
+@contextmanager
+def host_slot(url_or_host):
+    """Hold one of the per-host concurrency slots (also used around non-HTTP clients such as Gemini)."""
+    host = _host(url_or_host)
+    sem = _get_or_create(
+        _semaphores, host,
+        lambda: threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+    )
+    with sem:
+        yield
+
+def _count(host, key, n=1):
+    with _lock:
+        counters = _stats.setdefault(host, {"requests": 0, "bytes": 0, "retries": 0, "errors": 0})
+        counters[key] += n
+    instrumentation.count(f"http.{key}", n) # attributed to the current run stage, if any
+
+def stats():
+    """Per-host counters for the process: requests, bytes, retries, errors."""
+    with _lock:
+        return {host: dict(s) for host, s in _stats.items()}
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+class Cassette:
+    """
+    Recorded HTTP responses (and other recorded calls, see call_recorded) in one gzip'd
+    JSON file. Interactions are keyed by the final request URL; a URL requested several
+    times replays its recordings in order and then keeps returning the last one.
+    """
+    def __init__(self, path, mode="replay", latency=0.0):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.meta = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._interactions = {} # key -> [entry]
+        self._cursor = {}
+        if mode == "replay" or os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise
+            return
+        self.meta = data.get("meta", {})
+        for entry in data.get("interactions", []):
+            self._interactions.setdefault(entry["key"], []).append(entry)
+
+    def add(self, key, entry):
+        with self._lock:
+            self._interactions.setdefault(key, []).append(dict(entry, key=key))
+
+    def next(self, key):
+        """Next recorded entry for key, or None."""
+        with self._lock:
+            entries = self._interactions.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+            return entries[min(i, len(entries) - 1)]
+
+    def save(self):
+        with self._lock:
+            interactions = [entry for entries in self._interactions.values() for entry in entries]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump({"meta": self.meta, "interactions": interactions}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+_cassette = None
+
+def use_cassette(path, mode="replay", latency=0.0):
+    """
+    Route get() (and call_recorded) through a cassette.
+    mode="record": real requests, responses appended to the cassette (save() to write it).
+    mode="replay": no network; responses come from the cassette after `latency` seconds,
+    and unrecorded URLs fail like an unreachable host.
+    """
+    global _cassette
+    _cassette = Cassette(path, mode, latency)
+    return _cassette
+
+def stop_cassette():
+    global _cassette
+    cassette, _cassette = _cassette, None
+    return cassette
+
+def _request_key(url, params):
+    return "GET " + requests.Request("GET", url, params=params).prepare().url
+
+def _record_response(key, res):
+    _cassette.add(key, {
+        "status": res.status_code,
+        "headers": dict(res.headers),
+        "body": base64.b64encode(res.content).decode("ascii"),
+    })
+
+def _replay_response(key, url, encoding):
+    entry = _cassette.next(key)
+    if entry is None:
+        raise requests.ConnectionError(f"Not in cassette: {key}")
+    if "error" in entry:
+        raise requests.ConnectionError(entry["error"])
+    res = requests.Response()
+    res.status_code = entry["status"]
+    res.headers = CaseInsensitiveDict(entry["headers"])
+    res._content = base64.b64decode(entry["body"])
+    res.url = key[4:]
+    res.encoding = encoding or requests.utils.get_encoding_from_headers(res.headers)
+    return res
+
+def call_recorded(label, fn, *args):
+    """
+    fn(*args) for non-requests clients (FinanceDataReader); the result is kept in the
+    active cassette so replays don't need the network. DataFrames are stored as
+    to_json(orient="split"), anything else as plain JSON; nothing is unpickled on replay.
+    """
+    cassette = _cassette
+    if cassette is None:
+        return fn(*args)
+    key = f"{label} {json.dumps(args, default=str)}"
+    if cassette.mode == "replay":
+        entry = cassette.next(key)
+        if entry is None:
+            raise requests.ConnectionError(f"Not in cassette: {key}")
+        if cassette.latency:
+            time.sleep(cassette.latency)
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        if "frame" in entry:
+            import pandas as pd
+            from io import StringIO
+            frame = pd.read_json(StringIO(entry["frame"]), orient="split", dtype=False)
+            frame.index.name = entry.get("index_name") # not part of the split layout
+            return frame
+        if "value" in entry:
+            return entry["value"]
+        raise ValueError(f"Unreadable cassette entry for {key}; re-record the cassette")
+    try:
+        result = fn(*args)
+    except Exception as e:
+        cassette.add(key, {"error": f"{type(e).__name__}: {e}"})
+        raise
+    if hasattr(result, "to_json"):
+        cassette.add(key, {"frame": result.to_json(orient="split", date_format="iso"), "index_name": result.index.name})
+    else:
+        cassette.add(key, {"value": result})
+    return result
+
+def _backoff(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(delay / 2, delay) # "equal jitter"
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, encoding=None, retries=MAX_RETRIES):
+    """
+    GET through the pooled session for the URL's host.
+    Retries connection errors, timeouts and 429/5xx with jittered backoff; the final
+    response (or exception) is returned to the caller unchanged, so callers keep
+    using raise_for_status() as before.
+    """
+    with instrumentation.span("http"):
+        return _get(url, params, headers, timeout, encoding, retries)
+
+def _get(url, params, headers, timeout, encoding, retries):
+    host = _host(url)
+    cassette = _cassette
+    if cassette is not None and cassette.mode == "replay":
+        with host_slot(host):
+            if cassette.latency:
+                time.sleep(cassette.latency)
+            try:
+                res = _replay_response(_request_key(url, params), url, encoding)
+            except requests.ConnectionError:
+                _count(host, "errors")
+                raise
+        _count(host, "requests")
+        _count(host, "bytes", len(res.content))
+        return res
+
+    session = get_session(host)
+    bucket = _bucket(host)
+
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            with host_slot(host):
+                res = session.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _count(host, "errors")
+            if attempt >= retries:
+                if cassette is not None:
+                    cassette.add(_request_key(url, params), {"error": f"{type(e).__name__}: {e}"})
+                raise
+            _count(host, "retries")
+            time.sleep(_backoff(attempt))
+            continue
+
+        _count(host, "requests")
+        _count(host, "bytes", len(res.content))
+        if res.status_code in RETRY_STATUSES and attempt < retries:
+            _count(host, "retries")
+            time.sleep(_backoff(attempt, res.headers.get("Retry-After")))
+            continue
+
+        if cassette is not None:
+            _record_response(_request_key(url, params), res)
+        if encoding:
+            res.encoding = encoding
+        return res
+
+# HTTP_CASSETTE=path [HTTP_CASSETTE_MODE=record|replay] turns the cassette on for any entry point
+if os.getenv("HTTP_CASSETTE"):
+    use_cassette(os.getenv("HTTP_CASSETTE"), os.getenv("HTTP_CASSETTE_MODE", "replay"), float(os.getenv("HTTP_REPLAY_LATENCY", "0")))
+    if _cassette.mode == "record":
+        atexit.register(_cassette.save)
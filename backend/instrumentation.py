@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Run-scoped spans and counters.
+# A run is started by generate_daily_json; stage() marks the pipeline phase, span() times
+# an external call inside it and count() bumps counters. The active run and stage live in
+# context variables, and bind() carries them into worker threads, so a request made from
+# an executor is still attributed to the stage that submitted it.
+# Without an active run every helper is a no-op.
+
+_run = contextvars.ContextVar("instrumentation_run", default=None)
+_stage = contextvars.ContextVar("instrumentation_stage", default=None)
+# Inside profiled(): the list that bind() appends each worker call's cProfile.Profile to
+_thread_profiles = contextvars.ContextVar("instrumentation_thread_profiles", default=None)
+
+def _timing():
+    return {"calls": 0, "errors": 0, "wall": 0.0, "cpu": 0.0}
+
+class RunRecorder:
+    def __init__(self, market, date_str):
+        self.market = market
+        self.date_str = date_str
+        self.started_at = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._lock = threading.Lock()
+        self.stages = {} # stage -> timing + {"counters": {}, "spans": {}}
+        self.spans = {} # span name -> timing, over the whole run
+        self.counters = {}
+        self.extra = {}
+
+    def _stage_entry(self, stage):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = dict(_timing(), counters={}, spans={})
+            self.stages[stage] = entry
+        return entry
+
+    def add_span(self, name, stage, wall, cpu, failed):
+        with self._lock:
+            targets = [self.spans.setdefault(name, _timing())]
+            if stage:
+                targets.append(self._stage_entry(stage)["spans"].setdefault(name, _timing()))
+            for t in targets:
+                t["calls"] += 1
+                t["errors"] += int(failed)
+                t["wall"] += wall
+                t["cpu"] += cpu
+
+    def add_stage(self, stage, wall, cpu, failed):
+        with self._lock:
+            entry = self._stage_entry(stage)
+            entry["calls"] += 1
+            entry["errors"] += int(failed)
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+
+    def add_cpu(self, stage, cpu):
+        """CPU burnt by a worker thread on behalf of `stage`."""
+        with self._lock:
+            self._stage_entry(stage)["cpu"] += cpu
+
+    def count(self, name, n, stage):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if stage:
+                counters = self._stage_entry(stage)["counters"]
+                counters[name] = counters.get(name, 0) + n
+
+    def note(self, key, value):
+        with self._lock:
+            self.extra[key] = value
+
+    def report(self):
+        with self._lock:
+            return {
+                "market": self.market,
+                "date": self.date_str,
+                "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                "wall": round(time.perf_counter() - self._wall, 3),
+                "cpu": round(time.process_time() - self._cpu, 3),
+                "stages": _rounded(self.stages),
+                "spans": _rounded(self.spans),
+                "counters": dict(self.counters),
+                **self.extra,
+            }
+
+def _rounded(value):
+    if isinstance(value, dict):
+        return {k: _rounded(v) for k, v in value.items()}
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+def current_run():
+    return _run.get()
+
+@contextmanager
+def run(market, date_str):
+    """Make a new RunRecorder the active run for this context (and threads bound to it)."""
+    recorder = RunRecorder(market, date_str)
+    token = _run.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _run.reset(token)
+
+@contextmanager
+def stage(name):
+    """Time one pipeline stage; spans and counters inside it are attributed to it."""
+    recorder = _run.get()
+    if recorder is None:
+        yield
+        return
+    token = _stage.set(name)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _stage.reset(token)
+        recorder.add_stage(name, time.perf_counter() - wall, time.thread_time() - cpu, failed)
+
+@contextmanager
+def span(name):
+    """Time one external call (HTTP request, LLM call, FDR pull) within the current stage."""
+    recorder = _run.get()
+    if recorder is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        recorder.add_span(name, _stage.get(), time.perf_counter() - wall, time.thread_time() - cpu, failed)
+
+def count(name, n=1):
+    recorder = _run.get()
+    if recorder is not None:
+        recorder.count(name, n, _stage.get())
+
+def note(key, value):
+    """Attach a value (e.g. cache statistics) to the current run report."""
+    recorder = _run.get()
+    if recorder is not None:
+        recorder.note(key, value)
+
+def bind(fn):
+    """
+    Wrap fn so it runs in a copy of the caller's context (active run and stage) and its
+    thread CPU is added to that stage. Use for anything handed to an executor.
+    Under profiled() the call also runs under its own cProfile, merged into the pstats.
+    """
+    ctx = contextvars.copy_context()
+    recorder = ctx.get(_run)
+    if recorder is None:
+        return fn
+    thread_profiles = ctx.get(_thread_profiles)
+
+    def bound(*args, **kwargs):
+        cpu = time.thread_time()
+        profiler = _start_thread_profile(thread_profiles)
+        try:
+            return ctx.copy().run(fn, *args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            stage_name = ctx.get(_stage)
+            if stage_name:
+                recorder.add_cpu(stage_name, time.thread_time() - cpu)
+    return bound
+
+def _start_thread_profile(thread_profiles):
+    if thread_profiles is None:
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError: # Python 3.12+: one profiler per process, already covering every thread
+        return None
+    thread_profiles.append(profiler)
+    return profiler
+
+def write_report(recorder, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(recorder.report(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def profiled(prof_path, top=25):
+    """
+    cProfile + tracemalloc around a block. Writes pstats to `prof_path` and yields a dict
+    that is filled with the peak traced memory and the top allocation sites on exit.
+    cProfile only sees the thread that enables it, so work handed to executors through
+    bind() is profiled per call and merged in; threads started without bind() are missing.
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+    result = {}
+    profiler = cProfile.Profile()
+    thread_profiles = []
+    token = _thread_profiles.set(thread_profiles)
+    tracemalloc.start(10)
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        _thread_profiles.reset(token)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.makedirs(os.path.dirname(prof_path) or ".", exist_ok=True)
+        stats = pstats.Stats(profiler)
+        for thread_profile in list(thread_profiles):
+            # A worker call that recorded nothing can't be loaded
+            try:
+                stats.add(thread_profile)
+            except TypeError:
+                pass
+        stats.dump_stats(prof_path)
+        result["pstats"] = prof_path
+        result["peak_traced_bytes"] = peak
+        result["top_allocations"] = [
+            {"site": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ]
@@ -0,0 +1,54 @@
+import json
+
+class JSONObjectStream:
+    """
+    Incremental parser for a streamed JSON array of objects.
+    feed() takes the next piece of model output and returns the top-level objects that
+    became complete with it. Whatever surrounds the objects (the array brackets, commas,
+    code fences, a stray word) is skipped, an object that doesn't parse is dropped on its
+    own, and a truncated tail simply never completes, so everything before it survives.
+    """
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.dropped = 0
+
+    def feed(self, text):
+        objects = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == "{":
+                    self._buffer = [ch]
+                    self._depth = 1
+                continue
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads("".join(self._buffer))
+                    except ValueError:
+                        self.dropped += 1
+                    else:
+                        if isinstance(obj, dict):
+                            objects.append(obj)
+                    self._buffer = []
+        return objects
+
+    @property
+    def pending(self):
+        """True while an object has started but not yet closed."""
+        return self._depth > 0
@@ -0,0 +1,268 @@
+import os
+import re
+import json
+import time
+import random
+import itertools
+import threading
+
+try:
+    from backend.llm_cache import fingerprint
+except ImportError: # Executed as `python backend/crawler.py`
+    from llm_cache import fingerprint
+
+try:
+    from google import genai
+    from google.genai import types
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+    print("Warning: google-genai package not found. AI summaries will be disabled.")
+except Exception as e:
+    GENAI_AVAILABLE = False
+    print(f"Error loading google.generativeai: {e}")
+
+# Backend selection
+#   LLM_BACKEND=gemini  live API (default); GEMINI_BASE_URL points it at another endpoint
+#   LLM_BACKEND=record  live API, every response appended to LLM_RECORD_PATH
+#   LLM_BACKEND=replay  recorded responses, synthesized ones for unseen prompts; no network
+DEFAULT_RECORD_PATH = os.path.join("data", "llm_recordings.jsonl")
+
+# Replay knobs, to rehearse slow or flaky API days offline
+MOCK_LATENCY = float(os.getenv("LLM_MOCK_LATENCY", "0.5")) # seconds per call
+MOCK_JITTER = float(os.getenv("LLM_MOCK_JITTER", "0.2")) # +/- fraction of the latency
+MOCK_FAILURE_RATE = float(os.getenv("LLM_MOCK_FAILURE_RATE", "0")) # share of calls that error out
+MOCK_STREAM_PIECE = 64 # characters per streamed piece
+
+class GeminiBackend:
+    """Live Gemini API through one long-lived genai.Client."""
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._client = None
+
+    def available(self):
+        return bool(GENAI_AVAILABLE and self.api_key and self.api_key != "your_api_key_here")
+
+    @property
+    def live(self):
+        # Any other endpoint is treated as the local mock server (see serve)
+        return not self.base_url
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                http_options = types.HttpOptions(base_url=self.base_url) if self.base_url else None
+                self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+            return self._client
+
+    def _config(self, timeout, config):
+        config = dict(config or {})
+        config["http_options"] = types.HttpOptions(timeout=int(timeout * 1000))
+        return config
+
+    def generate(self, model, contents, timeout, config=None):
+        response = self._get_client().models.generate_content(model=model, contents=contents, config=self._config(timeout, config))
+        return response.text if response else None
+
+    def stream(self, model, contents, timeout, config=None):
+        for part in self._get_client().models.generate_content_stream(model=model, contents=contents, config=self._config(timeout, config)):
+            if part.text:
+                yield part.text
+
+class RecordingBackend:
+    """Wraps another backend and appends every (prompt key, response) to a JSONL file."""
+    def __init__(self, inner, path=DEFAULT_RECORD_PATH):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def available(self):
+        return self.inner.available()
+
+    @property
+    def live(self):
+        return self.inner.live
+
+    def _record(self, model, contents, text):
+        line = json.dumps({"key": prompt_key(model, contents), "model": model, "text": text}, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def generate(self, model, contents, timeout, config=None):
+        text = self.inner.generate(model, contents, timeout, config)
+        self._record(model, contents, text)
+        return text
+
+    def stream(self, model, contents, timeout, config=None):
+        pieces = []
+        for piece in self.inner.stream(model, contents, timeout, config):
+            pieces.append(piece)
+            yield piece
+        self._record(model, contents, "".join(pieces))
+
+class ReplayBackend:
+    """
+    Offline stand-in: answers from a recording, or synthesizes a well-formed answer for
+    the crawler's prompt shapes (article selection, batch summary, metadata bootstrap).
+    Each call sleeps `latency` (+/- jitter) and fails with probability `failure_rate`;
+    a failing stream breaks off halfway, like a dropped connection.
+    Its answers are not real summaries, so `live` is False and nothing it returns is
+    meant to be cached or published.
+    """
+    live = False
+
+    def __init__(self, path=DEFAULT_RECORD_PATH, latency=MOCK_LATENCY, jitter=MOCK_JITTER,
+                 failure_rate=MOCK_FAILURE_RATE, seed=None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.replayed = 0
+        self.synthesized = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recordings = None
+
+    def available(self):
+        return True
+
+    def _lookup(self, model, contents):
+        with self._lock:
+            if self._recordings is None:
+                self._recordings = {}
+                if self.path and os.path.exists(self.path):
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._recordings[entry["key"]] = entry["text"]
+            text = self._recordings.get(prompt_key(model, contents))
+            if text is None:
+                self.synthesized += 1
+                return synthesize_response(contents)
+            self.replayed += 1
+            return text
+
+    def _draw(self):
+        with self._lock:
+            delay = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.failure_rate
+        return max(0.0, delay), fail
+
+    def generate(self, model, contents, timeout, config=None):
+        delay, fail = self._draw()
+        time.sleep(min(delay, timeout))
+        if delay > timeout:
+            raise TimeoutError(f"replay: {model} exceeded {timeout}s")
+        if fail:
+            raise RuntimeError(f"replay: injected failure for {model}")
+        return self._lookup(model, contents)
+
+    def stream(self, model, contents, timeout, config=None):
+        delay, fail = self._draw()
+        text = self._lookup(model, contents)
+        pieces = [text[i:i + MOCK_STREAM_PIECE] for i in range(0, len(text), MOCK_STREAM_PIECE)] or [""]
+        cut = len(pieces) // 2 if fail else len(pieces)
+        for i, piece in enumerate(pieces):
+            if i == cut:
+                raise RuntimeError(f"replay: injected stream failure for {model}")
+            time.sleep(delay / len(pieces))
+            yield piece
+
+def prompt_key(model, contents):
+    return fingerprint("llm", model, contents)
+
+_STOCK_SECTION = re.compile(r"종목코드: (\S+) \| 종목명: (.+?) \|")
+_BOOTSTRAP_ITEM = re.compile(r"^- (.+) \((\S+)\)$", re.MULTILINE)
+
+def synthesize_response(prompt):
+    """Deterministic, schema-valid answer for the prompts this repo sends."""
+    stocks = _STOCK_SECTION.findall(prompt)
+    if stocks and '"index"' in prompt:
+        return json.dumps([{"symbol": symbol, "index": 0} for symbol, _ in stocks])
+    if stocks:
+        return json.dumps([
+            {"symbol": symbol, "category": "이슈", "short_reason": "재생 응답, 테스트",
+             "summary": f"{name}의 주가 변동 요약(재생 모드)입니다."}
+            for symbol, name in stocks
+        ], ensure_ascii=False)
+    items = _BOOTSTRAP_ITEM.findall(prompt)
+    if items and "peers" in prompt:
+        return json.dumps({symbol: {"industry": ["기타"], "peers": []} for _, symbol in items}, ensure_ascii=False)
+    return "[]"
+
+def make_backend(api_key=None):
+    """Backend named by LLM_BACKEND (gemini, record or replay)."""
+    kind = os.getenv("LLM_BACKEND", "gemini").lower()
+    path = os.getenv("LLM_RECORD_PATH", DEFAULT_RECORD_PATH)
+    if kind == "replay":
+        return ReplayBackend(path, seed=os.getenv("LLM_MOCK_SEED"))
+    live = GeminiBackend(api_key, base_url=os.getenv("GEMINI_BASE_URL"))
+    if kind == "record":
+        return RecordingBackend(live, path)
+    return live
+
+def serve(backend, host="127.0.0.1", port=8765):
+    """
+    Expose a backend over the Gemini REST shape (generateContent / streamGenerateContent
+    with SSE), so GEMINI_BASE_URL=http://host:port runs the real client against it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    def payload(text):
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}]}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            match = re.search(r"/models/([^/:]+):(generateContent|streamGenerateContent)", self.path)
+            if not match:
+                self.send_error(404)
+                return
+            model, method = match.groups()
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            contents = "".join(part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", []))
+            try:
+                if method == "generateContent":
+                    body = json.dumps(payload(backend.generate(model, contents, timeout=600)), ensure_ascii=False).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                pieces = backend.stream(model, contents, timeout=600)
+                first = next(pieces, "") # surface an immediate failure as an HTTP error
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for piece in itertools.chain([first], pieces):
+                    self.wfile.write(f"data: {json.dumps(payload(piece), ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+                    self.wfile.flush()
+            except Exception as e:
+                if not self.wfile.closed:
+                    try:
+                        self.send_error(503, str(e))
+                    except Exception:
+                        pass # headers already sent: the client sees a cut stream
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"LLM replay server on http://{host}:{port} ({type(backend).__name__})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve recorded/synthesized LLM responses over the Gemini REST API shape")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings", type=str, default=os.getenv("LLM_RECORD_PATH", DEFAULT_RECORD_PATH))
+    parser.add_argument("--latency", type=float, default=MOCK_LATENCY)
+    parser.add_argument("--failure-rate", type=float, default=MOCK_FAILURE_RATE)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    serve(ReplayBackend(args.recordings, latency=args.latency, failure_rate=args.failure_rate, seed=args.seed), port=args.port)
@@ -0,0 +1,91 @@
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    from backend import instrumentation
+except ImportError: # Executed as `python backend/crawler.py`
+    import instrumentation
+
+DEFAULT_TTL = 24 * 3600 # seconds
+DEFAULT_MAX_ENTRIES = 2000
+
+def change_bucket(change_val, step=1.0):
+    """Bucket a change rate so that small intraday drifts hit the same cache entry."""
+    return math.floor(change_val / step) * step
+
+def fingerprint(*parts):
+    """Stable key for a normalized prompt: any JSON-serializable parts, order preserved."""
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    Persistent cache of LLM decisions and summaries keyed by prompt fingerprint.
+    Entries expire after `ttl` seconds and the least recently used ones are dropped
+    beyond `max_entries`. Stored as one JSON file, oldest entries first.
+    """
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None # key -> {"value", "created"}, in LRU order
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for key, entry in json.load(f):
+                        self._entries[key] = entry
+            except Exception as e:
+                print(f"Error loading LLM cache: {e}")
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] > self.ttl:
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                instrumentation.count("llm_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            instrumentation.count("llm_cache.hits")
+            return entry["value"]
+
+    def put(self, key, value):
+        with self._lock:
+            self._load()
+            self._entries[key] = {"value": value, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            live = [[k, e] for k, e in self._entries.items() if now - e["created"] <= self.ttl]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(live, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
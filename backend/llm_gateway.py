@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+try:
+    from backend import http_client
+    from backend import instrumentation
+    from backend.llm_backends import make_backend
+except ImportError: # Executed as `python backend/crawler.py`
+    import http_client
+    import instrumentation
+    from llm_backends import make_backend
+
+GEMINI_HOST = "generativelanguage.googleapis.com"
+
+# Shared pool for every Gemini call in the process; in-flight requests are further capped
+# by http_client.HOST_CONCURRENCY[GEMINI_HOST].
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+
+# Per-model health
+EWMA_ALPHA = 0.3 # weight of the newest latency sample
+BREAKER_FAILURES = 3 # consecutive failures that open the breaker
+BREAKER_COOLDOWN = 300 # seconds before an open breaker lets one call through again
+TIMEOUT_GRACE = 2 # seconds the caller waits past the HTTP timeout before giving up
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class ModelStats:
+    def __init__(self, state=None):
+        state = state or {}
+        self.calls = state.get("calls", 0)
+        self.errors = state.get("errors", 0)
+        self.timeouts = state.get("timeouts", 0)
+        self.queue_timeouts = state.get("queue_timeouts", 0) # gave up waiting for a slot; not model errors
+        self.ewma_latency = state.get("ewma_latency") # seconds, None until the first success
+        self.consecutive_failures = state.get("consecutive_failures", 0)
+        self.open_until = state.get("open_until", 0)
+        self.probing = False # a half-open probe is in flight (not persisted)
+
+    def record_success(self, latency):
+        self.calls += 1
+        self.probing = False
+        self.consecutive_failures = 0
+        self.open_until = 0
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+
+    def record_failure(self, latency, timed_out):
+        """A call that held a Gemini slot and failed; waits for a slot never get here."""
+        self.calls += 1
+        self.probing = False
+        self.errors += 1
+        if timed_out:
+            self.timeouts += 1
+            # A timeout is a latency sample too: at least the time we waited
+            self.ewma_latency = latency if self.ewma_latency is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= BREAKER_FAILURES:
+            self.open_until = time.time() + BREAKER_COOLDOWN
+
+    def record_queue_timeout(self):
+        self.queue_timeouts += 1
+        self.cancel_probe()
+
+    def tripped(self):
+        return self.consecutive_failures >= BREAKER_FAILURES
+
+    def is_open(self):
+        """True while calls are refused: cooling down, or the half-open probe is in flight."""
+        return self.tripped() and (self.open_until > time.time() or self.probing)
+
+    def admit(self):
+        """
+        Whether a call may go to the model now. Once the cooldown is over the breaker is
+        half-open: exactly one call is let through as a probe, and its outcome closes the
+        breaker or opens it for another cooldown.
+        """
+        if not self.tripped():
+            return True
+        if self.is_open():
+            return False
+        self.probing = True
+        return True
+
+    def cancel_probe(self):
+        """The probe never got an answer from the model (queue wait, abandoned stream)."""
+        self.probing = False
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "queue_timeouts": self.queue_timeouts,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "consecutive_failures": self.consecutive_failures,
+            "open_until": self.open_until,
+        }
+
+def _is_timeout(error):
+    return isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower()
+
+class _Admission:
+    """
+    Hand-off between a caller and the worker running its call. Latency and the call's
+    timeout run from the moment the worker holds a Gemini slot, so time spent queued behind
+    other calls is never blamed on the model.
+    """
+    def __init__(self):
+        self.started = None # perf_counter() when the slot was acquired
+        self._abandoned = False
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+
+    def start(self):
+        """Worker side, holding the slot: False if the caller already gave up."""
+        with self._lock:
+            if self._abandoned:
+                return False
+            self.started = time.perf_counter()
+        self._event.set()
+        return True
+
+    def release(self, *args):
+        """Wake the caller without a slot (the call failed or was cancelled before starting)."""
+        self._event.set()
+
+    def wait(self, timeout):
+        """Caller side: True once the call holds a slot, False if it got none within `timeout`."""
+        self._event.wait(timeout)
+        with self._lock:
+            if self.started is None:
+                self._abandoned = True
+                return False
+            return True
+
+class LLMGateway:
+    """
+    One long-lived LLM backend (live Gemini, recorder or replay; see llm_backends) and one
+    bounded executor for the whole process.
+    Every call carries a timeout down to the backend, so a slow request is aborted by the
+    client and its worker thread is released instead of running on after the caller gave up.
+    The timeout starts once the call holds one of the HOST_CONCURRENCY[GEMINI_HOST] slots;
+    waiting for a slot is bounded separately (queue_timeout, `timeout` by default) and
+    counted as queue_timeouts, not as a model failure.
+    Per-model latency (EWMA) and error counts drive a circuit breaker and choose_model();
+    they are persisted to `stats_path` so the next cron run starts from recent numbers.
+    """
+    def __init__(self, api_key=None, stats_path=None, max_workers=LLM_MAX_WORKERS, backend=None):
+        self.backend = backend or make_backend(api_key)
+        self.stats_path = stats_path
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = None
+        self._dirty = False
+
+    def available(self):
+        return self.backend.available()
+
+    def live(self):
+        """False for replay and mock-server backends, whose answers must not be cached or published."""
+        return getattr(self.backend, "live", True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+            return self._executor
+
+    def _load_stats(self):
+        if self._stats is not None:
+            return
+        self._stats = {}
+        if self.stats_path and os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, "r", encoding="utf-8") as f:
+                    self._stats = {model: ModelStats(state) for model, state in json.load(f).items()}
+            except Exception as e:
+                print(f"Error loading LLM stats: {e}")
+
+    def slots(self):
+        """Concurrent Gemini requests the process allows; callers size their fan-out to it."""
+        return http_client.HOST_CONCURRENCY.get(GEMINI_HOST, http_client.DEFAULT_HOST_CONCURRENCY)
+
+    def _model_stats(self, model):
+        self._load_stats()
+        if model not in self._stats:
+            self._stats[model] = ModelStats()
+        return self._stats[model]
+
+    def generate(self, model, contents, timeout, config=None, queue_timeout=None):
+        """
+        Response text for one generate_content call, or raise.
+        Raises CircuitOpenError without calling the API while the model's breaker is open,
+        and TimeoutError when no slot freed up within `queue_timeout` seconds or no answer
+        arrived within `timeout` seconds of getting one.
+        """
+        self._check_breaker(model)
+        executor = self._get_executor()
+
+        admission = _Admission()
+
+        def call():
+            with http_client.host_slot(GEMINI_HOST):
+                if not admission.start():
+                    return None
+                return self.backend.generate(model, contents, timeout, config)
+
+        future = executor.submit(instrumentation.bind(call))
+        future.add_done_callback(admission.release)
+        self._admit(model, admission, future, timeout if queue_timeout is None else queue_timeout)
+        try:
+            with instrumentation.span("llm"):
+                text = future.result(timeout=max(0, admission.started + timeout + TIMEOUT_GRACE - time.perf_counter()))
+        except Exception as e:
+            self._record(model, time.perf_counter() - admission.started, ok=False, timed_out=_is_timeout(e))
+            raise
+        self._record(model, time.perf_counter() - admission.started, ok=True)
+        return text
+
+    def _check_breaker(self, model):
+        with self._lock:
+            if not self._model_stats(model).admit():
+                instrumentation.count("llm.circuit_open")
+                raise CircuitOpenError(f"{model} circuit open")
+
+    def _cancel_probe(self, model):
+        with self._lock:
+            self._model_stats(model).cancel_probe()
+
+    def _admit(self, model, admission, future, queue_timeout):
+        """Wait for the call to get a slot; on giving up, count a queue timeout and raise."""
+        with instrumentation.span("llm.queue"):
+            admitted = admission.wait(queue_timeout)
+        if admitted:
+            return
+        future.cancel() # still queued behind other calls: never starts
+        if future.done() and not future.cancelled():
+            self._cancel_probe(model)
+            future.result() # failed before reaching the model (e.g. executor shut down)
+        instrumentation.count("llm.queue_timeout")
+        with self._lock:
+            self._model_stats(model).record_queue_timeout()
+            self._dirty = True
+        raise TimeoutError(f"{model}: no Gemini slot free within {queue_timeout}s")
+
+    def generate_stream(self, model, contents, timeout, config=None, queue_timeout=None):
+        """
+        Yield response text pieces from the backend stream as they arrive.
+        The stream is pumped on the shared executor; once it holds a slot the caller gets at
+        most `timeout` seconds overall. On timeout, error or an abandoned generator the pump
+        stops at the next piece and its worker is released.
+        """
+        self._check_breaker(model)
+        executor = self._get_executor()
+        pieces = queue.Queue()
+        stop = threading.Event()
+        done = object()
+        admission = _Admission()
+
+        def pump():
+            try:
+                with http_client.host_slot(GEMINI_HOST), instrumentation.span("llm.stream"):
+                    if not admission.start():
+                        return
+                    for piece in self.backend.stream(model, contents, timeout, config):
+                        if stop.is_set():
+                            return
+                        pieces.put(piece)
+                pieces.put(done)
+            except Exception as e:
+                pieces.put(e)
+
+        future = executor.submit(instrumentation.bind(pump))
+        future.add_done_callback(admission.release)
+        self._admit(model, admission, future, timeout if queue_timeout is None else queue_timeout)
+        deadline = admission.started + timeout + TIMEOUT_GRACE
+        try:
+            # The span times the pump, not this generator: it would also count the time the
+            # consumer spends between pieces.
+            while True:
+                try:
+                    piece = pieces.get(timeout=max(0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    raise TimeoutError(f"{model} stream timed out after {timeout}s")
+                if piece is done:
+                    break
+                if isinstance(piece, Exception):
+                    raise piece
+                yield piece
+        except Exception as e:
+            self._record(model, time.perf_counter() - admission.started, ok=False, timed_out=_is_timeout(e))
+            raise
+        except GeneratorExit: # consumer stopped reading: no verdict on the model
+            self._cancel_probe(model)
+            raise
+        finally:
+            stop.set()
+            future.cancel()
+        self._record(model, time.perf_counter() - admission.started, ok=True)
+
+    def _record(self, model, latency, ok, timed_out=False):
+        with self._lock:
+            stats = self._model_stats(model)
+            if ok:
+                stats.record_success(latency)
+            else:
+                stats.record_failure(latency, timed_out)
+                if stats.is_open():
+                    print(f"{model}: {stats.consecutive_failures} consecutive failures, circuit open for {BREAKER_COOLDOWN}s")
+            self._dirty = True
+
+    def choose_model(self, candidates, max_latency=None):
+        """
+        First candidate whose breaker is closed and whose recent latency fits `max_latency`.
+        Falls back to the closed candidate with the lowest latency, then to the first one.
+        """
+        with self._lock:
+            closed = [m for m in candidates if not self._model_stats(m).is_open()]
+            for model in closed:
+                latency = self._stats[model].ewma_latency
+                if max_latency is None or latency is None or latency <= max_latency:
+                    return model
+            if closed:
+                return min(closed, key=lambda m: self._stats[m].ewma_latency)
+            return candidates[0]
+
+    def stats(self):
+        with self._lock:
+            self._load_stats()
+            return {model: stats.to_dict() for model, stats in self._stats.items()}
+
+    def save(self):
+        with self._lock:
+            if not (self._dirty and self.stats_path):
+                return
+            os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+            tmp_path = f"{self.stats_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({model: stats.to_dict() for model, stats in self._stats.items()}, f, indent=1)
+            os.replace(tmp_path, self.stats_path)
+            self._dirty = False
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
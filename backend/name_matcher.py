@@ -0,0 +1,120 @@
+import re
+from collections import deque, namedtuple
+
+# Characters that continue a word in a Korean/English headline; used for the
+# short-name boundary rule ("SK" must not match inside "SK하이닉스" or "SK온").
+_WORD_CHAR = re.compile(r"[가-힣a-zA-Z0-9]")
+SHORT_NAME_LEN = 2
+
+# Broad market wrap-up vocabulary; several of these in one title usually means index news
+MARKET_TERMS = ["코스피", "코스닥", "지수", "시황", "마감", "뉴욕증시", "블루칩", "글로벌 증시", "아시아 증시"]
+
+TitleScore = namedtuple("TitleScore", ["has_name", "is_main_subject", "market_noise"])
+
+class NameMatcher:
+    """
+    Aho–Corasick automaton over stock names.
+    find(title) returns every symbol whose name occurs in the title in a single pass,
+    however many names are loaded. Names of SHORT_NAME_LEN characters or less only
+    match on word boundaries, the same rule scrape_naver_news applies.
+    """
+    def __init__(self, names, terms=(), ignore_case=False):
+        # names: {symbol: name}; terms: plain substrings matched without the boundary rule
+        self.ignore_case = ignore_case
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._patterns = [] # (text, is_term)
+        self._name_ids = {}
+        self._symbols = [] # pattern id -> [symbols]
+        for symbol, name in names.items():
+            if not name:
+                continue
+            if name not in self._name_ids:
+                self._name_ids[name] = self._add(name, False)
+            self._symbols[self._name_ids[name]].append(symbol)
+        self._term_ids = [self._add(term, True) for term in terms]
+        self._build()
+
+    def _add(self, word, is_term):
+        pattern_id = len(self._patterns)
+        self._patterns.append((word, is_term))
+        self._symbols.append([])
+        node = 0
+        for ch in (word.lower() if self.ignore_case else word):
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pattern_id)
+        return pattern_id
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _scan(self, text):
+        """Yield (pattern_id, start, end) for every occurrence that passes the boundary rule."""
+        haystack = text.lower() if self.ignore_case else text
+        node = 0
+        for i, ch in enumerate(haystack):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern_id in self._out[node]:
+                word, is_term = self._patterns[pattern_id]
+                start, end = i - len(word) + 1, i + 1
+                if not is_term and len(word) <= SHORT_NAME_LEN:
+                    if start > 0 and _WORD_CHAR.match(text[start - 1]):
+                        continue
+                    if end < len(text) and _WORD_CHAR.match(text[end]):
+                        continue
+                yield pattern_id, start, end
+
+    def find(self, text):
+        """Set of symbols mentioned in text."""
+        found = set()
+        for pattern_id, _, _ in self._scan(text):
+            found.update(self._symbols[pattern_id])
+        return found
+
+class TitleMatcher(NameMatcher):
+    """
+    Relevance scoring for headlines, compiled once per stock universe.
+    classify(title, name) returns has-name, is-main-subject and market-noise in one pass
+    over the title instead of building regexes per article.
+    """
+    def __init__(self, names, market_terms=MARKET_TERMS, ignore_case=False):
+        super().__init__(names, terms=market_terms, ignore_case=ignore_case)
+
+    def knows(self, name):
+        return name in self._name_ids
+
+    def classify(self, title, name):
+        target = self._name_ids.get(name)
+        has_name = False
+        is_main_subject = False
+        terms_seen = set()
+        for pattern_id, start, end in self._scan(title):
+            if self._patterns[pattern_id][1]:
+                terms_seen.add(pattern_id)
+            elif pattern_id == target:
+                has_name = True
+                # Subject forms: "삼성전자 ..." (leading), "[..삼성전자..]", "삼성전자 :"
+                if start == 0 or ("[" in title[:start] and "]" in title[end:]):
+                    is_main_subject = True
+                elif title[end:].lstrip().startswith(":"):
+                    is_main_subject = True
+        return TitleScore(has_name, is_main_subject, len(terms_seen))
@@ -0,0 +1,59 @@
+import os
+import json
+import threading
+
+class NewsWatermarks:
+    """
+    Per-symbol high-water marks for the Naver news list.
+    For each symbol it keeps the newest article seen (url + date) and the raw rows
+    collected for the current lookback window, so the next run only pages until it
+    reaches the watermark and merges what it finds with the stored rows.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = None
+        self._dirty = False
+
+    def _load(self):
+        if self._state is None:
+            self._state = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self._state = json.load(f)
+                except Exception as e:
+                    print(f"Error loading news watermarks: {e}")
+
+    def get(self, symbol):
+        """Stored {"newest": {"url", "date"}, "rows": [...]} for a symbol, or None."""
+        with self._lock:
+            self._load()
+            return self._state.get(symbol)
+
+    def update(self, symbol, rows, keep_since):
+        """
+        Replace the stored rows for a symbol with `rows` (newest first), dropping
+        anything dated before `keep_since` (YYYY.MM.DD).
+        """
+        rows = [r for r in rows if r.get("date", "")[:10] >= keep_since]
+        if not rows:
+            return
+        with self._lock:
+            self._load()
+            self._state[symbol] = {
+                "newest": {"url": rows[0]["url"], "date": rows[0]["date"]},
+                "rows": rows,
+            }
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
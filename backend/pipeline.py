@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+
+try:
+    from backend import instrumentation
+except ImportError: # Executed as `python backend/crawler.py`
+    import instrumentation
+
+# Staged pipeline: threads per stage, connected by bounded channels.
+# A stage starts on the first item its upstream produces, so a slow stage only holds back
+# the items behind it instead of the whole run. A full channel blocks its producer
+# (backpressure); a failing item is recorded and skipped so the stream keeps draining,
+# and join() re-raises the first failure once every stage has finished.
+
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+_END = object()
+
+class Channel:
+    """Bounded queue between stages. Iteration ends once every producer has closed it."""
+    def __init__(self, maxsize=QUEUE_SIZE, producers=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._producers = producers
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def close(self):
+        with self._lock:
+            self._producers -= 1
+            last = self._producers == 0
+        if last:
+            self._queue.put(_END)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                self._queue.put(_END) # let the other consumers stop too
+                return
+            yield item
+
+class Pipeline:
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.timings = {} # stage -> {"workers", "items", "errors", "first_start", "last_end"}
+        self._threads = []
+        self._errors = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def _start(self, name, target, workers):
+        with self._lock:
+            self.timings[name] = {"workers": workers, "items": 0, "errors": 0, "first_start": None, "last_end": None}
+        for i in range(workers):
+            thread = threading.Thread(target=instrumentation.bind(target), name=f"{self.name}-{name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _mark(self, name, start, end, failed):
+        with self._lock:
+            t = self.timings[name]
+            t["items"] += 1
+            t["errors"] += int(failed)
+            offset = start - self._started
+            t["first_start"] = offset if t["first_start"] is None else min(t["first_start"], offset)
+            t["last_end"] = max(t["last_end"] or 0.0, end - self._started)
+
+    def _run_item(self, name, fn, *args):
+        start = time.perf_counter()
+        failed = False
+        try:
+            with instrumentation.stage(name):
+                return fn(*args)
+        except Exception as e:
+            failed = True
+            print(f"{self.name}/{name} failed: {e}")
+            with self._lock:
+                self._errors.append(e)
+            return None
+        finally:
+            self._mark(name, start, time.perf_counter(), failed)
+
+    def source(self, name, fn, *outboxes):
+        """Run fn(emit) on one thread; emit(item) puts item on every outbox."""
+        def emit(item):
+            for outbox in outboxes:
+                outbox.put(item)
+
+        def target():
+            try:
+                self._run_item(name, fn, emit)
+            finally:
+                for outbox in outboxes:
+                    outbox.close()
+        self._start(name, target, 1)
+
+    def stage(self, name, fn, inbox, *outboxes, workers=1):
+        """
+        `workers` threads apply fn to the items of inbox; non-None results go to every
+        outbox, which are closed once the last worker is done.
+        """
+        workers = max(1, workers)
+        running = [workers]
+
+        def target():
+            try:
+                for item in inbox:
+                    result = self._run_item(name, fn, item)
+                    if result is not None:
+                        for outbox in outboxes:
+                            outbox.put(result)
+            finally:
+                with self._lock:
+                    running[0] -= 1
+                    last = running[0] == 0
+                if last:
+                    for outbox in outboxes:
+                        outbox.close()
+        self._start(name, target, workers)
+
+    def sink(self, inbox):
+        """
+        Drain inbox on a thread of its own, so the stages feeding it never stall on a full
+        channel while the caller is waiting on another branch. Returns a callable that
+        blocks until the inbox is closed and returns its items in arrival order.
+        """
+        items = []
+        done = threading.Event()
+
+        def target():
+            try:
+                items.extend(inbox)
+            finally:
+                done.set()
+        thread = threading.Thread(target=target, name=f"{self.name}-sink", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+        def wait():
+            done.wait()
+            return items
+        return wait
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def report(self):
+        with self._lock:
+            return {
+                name: dict(t, first_start=round(t["first_start"] or 0.0, 3), last_end=round(t["last_end"] or 0.0, 3))
+                for name, t in self.timings.items()
+            }
@@ -0,0 +1,149 @@
+import os
+import threading
+
+import numpy as np
+
+# One fixed-size record per (symbol, session). Dates are stored as YYYYMMDD integers
+# so that range checks stay vectorized. prev_close is the close of the session before,
+# taken from the same download; NaN when that session wasn't in it, so a bar written after
+# a gap in the store never reports a multi-week move as one day's change.
+BAR_DTYPE = np.dtype([
+    ("symbol", "S12"),
+    ("date", "<i4"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("prev_close", "<f8"),
+])
+
+def _date_int(date_str):
+    return int(date_str.replace("-", ""))
+
+def _date_str(date_int):
+    s = str(int(date_int))
+    return f"{s[:4]}-{s[4:6]}-{s[6:]}"
+
+class PriceStore:
+    """
+    Append-only daily-bar store for one market.
+    The file is a flat array of BAR_DTYPE records, so it is memory-mapped on read and
+    columns are plain views (bars["close"]). Only completed sessions are appended and
+    rows are never rewritten. The file is binary, so on GitHub Actions it is carried
+    between runs in the Actions cache rather than committed.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._bars = None
+        self._index = None
+
+    def _load(self):
+        if self._bars is not None:
+            return
+        count = 0
+        if os.path.exists(self.path):
+            count = os.path.getsize(self.path) // BAR_DTYPE.itemsize
+        if count:
+            self._bars = np.memmap(self.path, dtype=BAR_DTYPE, mode="r", shape=(count,))
+        else:
+            self._bars = np.zeros(0, dtype=BAR_DTYPE)
+
+        # symbol -> row positions sorted by date
+        order = np.lexsort((self._bars["date"], self._bars["symbol"]))
+        symbols = self._bars["symbol"][order]
+        uniq, starts = np.unique(symbols, return_index=True)
+        bounds = list(starts) + [len(order)]
+        self._index = {
+            sym.decode(): order[bounds[i]:bounds[i + 1]]
+            for i, sym in enumerate(uniq)
+        }
+
+    def _symbol_bars(self, symbol):
+        self._load()
+        rows = self._index.get(symbol)
+        if rows is None:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        return np.array(self._bars[rows])
+
+    def bars(self, symbol):
+        """All stored bars for a symbol, oldest first."""
+        with self._lock:
+            return self._symbol_bars(symbol)
+
+    def last_date(self, symbol):
+        bars = self.bars(symbol)
+        return _date_str(bars["date"][-1]) if len(bars) else None
+
+    def closes(self, symbol, end_date_str=None):
+        """[(date_str, close), ...] up to and including end_date_str."""
+        bars = self.bars(symbol)
+        if end_date_str:
+            bars = bars[bars["date"] <= _date_int(end_date_str)]
+        return [(_date_str(d), float(c)) for d, c in zip(bars["date"], bars["close"])]
+
+    def change_pct(self, symbol, date_str):
+        """Change rate of the session on date_str versus the session before it, or None."""
+        bars = self.bars(symbol)
+        pos = np.searchsorted(bars["date"], _date_int(date_str))
+        if pos >= len(bars) or bars["date"][pos] != _date_int(date_str):
+            return None
+        prev_close = bars["prev_close"][pos]
+        if np.isnan(prev_close) or not prev_close:
+            return None # previous session not known (first bar after a gap)
+        return float((bars["close"][pos] - prev_close) / prev_close * 100)
+
+    def latest_on_or_before(self, symbol, date_str):
+        """
+        Last session on or before date_str, or None when the store can't tell: the next
+        stored bar must have been downloaded together with its previous session, otherwise
+        a gap in the store could hide later sessions.
+        """
+        bars = self.bars(symbol)
+        target = _date_int(date_str)
+        pos = np.searchsorted(bars["date"], target, side="right")
+        if pos == 0:
+            return None
+        if bars["date"][pos - 1] != target and (pos >= len(bars) or np.isnan(bars["prev_close"][pos])):
+            return None
+        return _date_str(bars["date"][pos - 1])
+
+    def append(self, symbol, rows, final_before):
+        """
+        Append bars newer than what is stored for `symbol`.
+        rows: every session of one download, as (date_str, open, high, low, close, volume).
+        Each bar's prev_close is the row before it in `rows`, so start the download at the
+        last stored session to chain onto the store. Sessions on or after `final_before`
+        (YYYY-MM-DD) are still trading and are skipped.
+        Returns the number of bars written.
+        """
+        rows = sorted(rows)
+        prev_closes = [float("nan")] + [r[4] for r in rows[:-1]]
+        with self._lock:
+            # Checked and written under one lock, so two threads can't both append the same days
+            stored = self._symbol_bars(symbol)
+            last = _date_str(stored["date"][-1]) if len(stored) else None
+            new_rows = [
+                (r, prev) for r, prev in zip(rows, prev_closes)
+                if (last is None or r[0] > last) and r[0] < final_before
+            ]
+            if not new_rows:
+                return 0
+
+            records = np.zeros(len(new_rows), dtype=BAR_DTYPE)
+            for i, ((d, o, h, l, c, v), prev) in enumerate(new_rows):
+                records[i] = (symbol.encode(), _date_int(d), o, h, l, c, v, prev)
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Drop a torn trailing record left by an interrupted write so appends stay aligned
+            if os.path.exists(self.path):
+                size = os.path.getsize(self.path)
+                if size % BAR_DTYPE.itemsize:
+                    with open(self.path, "r+b") as f:
+                        f.truncate(size - size % BAR_DTYPE.itemsize)
+            with open(self.path, "ab") as f:
+                f.write(records.tobytes())
+            self._bars = None
+            self._index = None
+        return len(new_rows)
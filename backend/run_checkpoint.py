@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import shutil
+import threading
+
+# Checkpoints older than this are not resumed (their prices and headlines are stale) and
+# are removed when the next run of the same market starts. Age is counted from the
+# created_at stored in the checkpoint: file mtimes are reset by a git checkout.
+CHECKPOINT_MAX_AGE = int(os.getenv("CHECKPOINT_MAX_AGE", "3600")) # seconds
+META_FILE = "checkpoint.json"
+
+class RunCheckpoint:
+    """
+    Stage results of one crawl run, under {root}/{market}_{date}_{run_id}/.
+    Whole-stage results are one JSON file each ({stage}.json); per-symbol stages append one
+    line per finished symbol ({stage}.jsonl), so a run killed mid-stage keeps every symbol
+    it got through. finish() removes the directory once the day file is written.
+    checkpoint.json holds created_at, set by the first write and kept when resumed.
+    """
+    def __init__(self, root, market, date_str, run_id):
+        self.root = root
+        self.market = market
+        self.date_str = date_str
+        self.run_id = str(run_id)
+        self.path = os.path.join(root, f"{market}_{date_str}_{self.run_id}")
+        self.resumed = {} # stage -> number of results loaded from disk
+        self._lock = threading.Lock()
+        self._appending = set() # .jsonl files whose tail was checked by this process
+
+    @classmethod
+    def latest(cls, root, market, date_str, max_age=CHECKPOINT_MAX_AGE):
+        """Most recently created checkpoint of (market, date) younger than max_age, or None."""
+        prefix = f"{market}_{date_str}_"
+        if not os.path.isdir(root):
+            return None
+        candidates = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith(prefix) and os.path.isdir(path):
+                created = _created_at(path)
+                if time.time() - created <= max_age:
+                    candidates.append((created, name[len(prefix):]))
+        if not candidates:
+            return None
+        return cls(root, market, date_str, max(candidates)[1])
+
+    @staticmethod
+    def prune(root, market, keep=None, max_age=CHECKPOINT_MAX_AGE):
+        """Remove the market's checkpoints older than max_age (except `keep`)."""
+        if not os.path.isdir(root):
+            return
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.startswith(f"{market}_") and path != keep and os.path.isdir(path):
+                if time.time() - _created_at(path) > max_age:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def get_stage(self, stage):
+        """Saved result of a whole stage, or None if the stage never finished."""
+        path = os.path.join(self.path, f"{stage}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except Exception as e:
+            print(f"Error loading checkpoint {path}: {e}")
+            return None
+        self.resumed[stage] = 1
+        return value
+
+    def _ensure_dir(self):
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"created_at": time.time()}, f)
+
+    def put_stage(self, stage, value):
+        with self._lock:
+            self._ensure_dir()
+        path = os.path.join(self.path, f"{stage}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def symbols(self, stage):
+        """{symbol: result} for every symbol a per-symbol stage already finished."""
+        path = os.path.join(self.path, f"{stage}.jsonl")
+        results = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # torn last line of a killed run
+                    results[entry["symbol"]] = entry["result"]
+        if results:
+            self.resumed[stage] = len(results)
+        return results
+
+    def put_symbol(self, stage, symbol, result):
+        line = json.dumps({"symbol": symbol, "result": result}, ensure_ascii=False)
+        path = os.path.join(self.path, f"{stage}.jsonl")
+        with self._lock:
+            self._ensure_dir()
+            if path not in self._appending:
+                _drop_torn_line(path)
+                self._appending.add(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def finish(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def _created_at(path):
+    """created_at of a checkpoint directory; 0 (expired) when unreadable or written before it existed."""
+    try:
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            return float(json.load(f)["created_at"])
+    except Exception:
+        return 0.0
+
+def _drop_torn_line(path):
+    """Cut a last line without its newline (a run killed mid-write) so appends start on a fresh line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
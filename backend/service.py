@@ -0,0 +1,210 @@
+"""
+Resident crawler: one process that keeps HTTP sessions, price/article/LLM caches and the
+parsed metadata warm, and runs generate_daily_json for each market while it trades.
+
+    python backend/service.py                 # KR and US, every CRAWL_INTERVAL seconds
+    python backend/service.py --port 8080     # /healthz and /metrics on another port
+
+Runs resume from their checkpoint, so a tick that died is picked up by the next one.
+stock_metadata.json is re-read between runs when its mtime changes.
+"""
+import os
+import sys
+import time
+import signal
+import datetime
+import argparse
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from backend import crawler
+from backend import http_client
+
+# KST trading windows, with a few minutes' margin for the closing print. The US window
+# crosses midnight (22:30 covers the DST open); its ticks are attributed to a session
+# by crawler._attributed_day, the rule get_last_trading_day uses.
+MARKET_HOURS = {
+    "KR": (datetime.time(9, 0), datetime.time(15, 50)),
+    "US": (datetime.time(22, 30), datetime.time(7, 0)),
+}
+CRAWL_INTERVAL = int(os.getenv("CRAWL_INTERVAL", "1200")) # seconds between runs of a market
+SCHEDULER_TICK = 30 # seconds between schedule checks
+UNHEALTHY_AFTER = 3 # consecutive failed runs of a market that fail /healthz
+
+def market_open(market, kst_now):
+    """True while `market` trades at `kst_now` (weekday sessions; holidays are not known here)."""
+    start, end = MARKET_HOURS[market]
+    now = kst_now.time()
+    inside = start <= now <= end if start <= end else (now >= start or now <= end)
+    return inside and crawler._attributed_day(market, kst_now).weekday() < 5
+
+class CrawlerService:
+    def __init__(self, markets, interval=CRAWL_INTERVAL, workers=None, news_mode=None):
+        self.markets = markets
+        self.interval = interval
+        self.workers = workers
+        self.news_mode = news_mode
+        self.started = time.time()
+        self.metadata_reloads = 0
+        self.state = {
+            market: {"runs": 0, "failures": 0, "consecutive_failures": 0, "running": False,
+                     "last_date": None, "last_start": None, "last_duration": None,
+                     "last_success": None, "last_error": None, "next_run": 0.0}
+            for market in markets
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run_market(self, market):
+        with self._lock:
+            state = self.state[market]
+            state["running"] = True
+            state["last_start"] = time.time()
+        error = None
+        try:
+            date_str = crawler.get_last_trading_day(market=market)
+            crawler.generate_daily_json(date_str, market=market, workers=self.workers, news_mode=self.news_mode, resume=True)
+        except Exception as e:
+            date_str = None
+            error = f"{type(e).__name__}: {e}"
+            print(f"{market} run failed: {error}")
+        with self._lock:
+            state["running"] = False
+            state["runs"] += 1
+            state["last_duration"] = time.time() - state["last_start"]
+            if error:
+                state["failures"] += 1
+                state["consecutive_failures"] += 1
+                state["last_error"] = error
+            else:
+                state["consecutive_failures"] = 0
+                state["last_success"] = time.time()
+                state["last_date"] = date_str
+            # Start-to-start spacing, so a slow run doesn't push the schedule back
+            state["next_run"] = state["last_start"] + self.interval
+
+    def loop(self):
+        print(f"Crawler service: {', '.join(self.markets)} every {self.interval}s while the market is open.")
+        while not self._stop.is_set():
+            kst_now = crawler._kst_now()
+            due = []
+            with self._lock:
+                for market in self.markets:
+                    if not market_open(market, kst_now):
+                        self.state[market]["next_run"] = 0.0 # run right away at the next open
+                    elif time.time() >= self.state[market]["next_run"]:
+                        due.append(market)
+            if due:
+                if crawler.reload_stock_metadata(): # only between runs
+                    self.metadata_reloads += 1
+                    print("stock_metadata.json changed; reloaded.")
+                # Markets due together (e.g. around the US close) run concurrently, as with --market KR,US
+                threads = [threading.Thread(target=self.run_market, args=(market,), name=f"crawl-{market}") for market in due]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            self._stop.wait(SCHEDULER_TICK)
+        crawler.get_llm_gateway().shutdown()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def health(self):
+        with self._lock:
+            failing = [m for m, s in self.state.items() if s["consecutive_failures"] >= UNHEALTHY_AFTER]
+            body = {
+                "status": "failing" if failing else "ok",
+                "uptime": round(time.time() - self.started),
+                "markets": {m: dict(s) for m, s in self.state.items()},
+            }
+        return not failing, body
+
+    def metrics(self):
+        """Prometheus text exposition of run, HTTP, cache and LLM counters."""
+        lines = [
+            f"crawler_uptime_seconds {time.time() - self.started:.0f}",
+            f"crawler_metadata_reloads_total {self.metadata_reloads}",
+        ]
+        kst_now = crawler._kst_now()
+        with self._lock:
+            for market, s in self.state.items():
+                label = f'market="{market}"'
+                lines += [
+                    f"crawler_market_open{{{label}}} {int(market_open(market, kst_now))}",
+                    f"crawler_running{{{label}}} {int(s['running'])}",
+                    f'crawler_runs_total{{{label},status="ok"}} {s["runs"] - s["failures"]}',
+                    f'crawler_runs_total{{{label},status="failed"}} {s["failures"]}',
+                    f"crawler_consecutive_failures{{{label}}} {s['consecutive_failures']}",
+                ]
+                if s["last_duration"] is not None:
+                    lines.append(f"crawler_last_run_duration_seconds{{{label}}} {s['last_duration']:.3f}")
+                if s["last_success"] is not None:
+                    lines.append(f"crawler_last_success_timestamp_seconds{{{label}}} {s['last_success']:.0f}")
+        for host, counters in sorted(http_client.stats().items()):
+            for key, value in counters.items():
+                lines.append(f'crawler_http_{key}_total{{host="{host}"}} {value}')
+        caches = {"article": crawler.get_article_cache(), "llm": crawler.get_llm_cache()}
+        for name, cache in caches.items():
+            lines.append(f'crawler_cache_hits_total{{cache="{name}"}} {cache.hits}')
+            lines.append(f'crawler_cache_misses_total{{cache="{name}"}} {cache.misses}')
+        for model, stats in sorted(crawler.get_llm_gateway().stats().items()):
+            label = f'model="{model}"'
+            lines.append(f"crawler_llm_calls_total{{{label}}} {stats['calls']}")
+            lines.append(f"crawler_llm_errors_total{{{label}}} {stats['errors']}")
+            lines.append(f"crawler_llm_queue_timeouts_total{{{label}}} {stats['queue_timeouts']}")
+            if stats["ewma_latency"] is not None:
+                lines.append(f"crawler_llm_latency_seconds{{{label}}} {stats['ewma_latency']}")
+        return "\n".join(lines) + "\n"
+
+def serve_http(service, host="0.0.0.0", port=8080):
+    """/healthz (200, or 503 once a market keeps failing) and /metrics on a daemon thread."""
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                ok, body = service.health()
+                payload, status, content_type = json.dumps(body, ensure_ascii=False).encode("utf-8"), 200 if ok else 503, "application/json"
+            elif self.path == "/metrics":
+                payload, status, content_type = service.metrics().encode("utf-8"), 200, "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="service-http", daemon=True).start()
+    print(f"Health and metrics on http://{host}:{port}/healthz, /metrics")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident Toss Signal crawler")
+    parser.add_argument("--markets", type=str, default="KR,US")
+    parser.add_argument("--interval", type=int, default=CRAWL_INTERVAL, help="Seconds between runs of a market")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=crawler.DEFAULT_WORKERS)
+    parser.add_argument("--news-mode", type=str, choices=["symbol", "market"], default=crawler.DEFAULT_NEWS_MODE)
+    args = parser.parse_args()
+    if not crawler.get_llm_gateway().live():
+        print(f"Offline LLM backend: writing to {crawler.use_scratch_data_dir()}")
+
+    service = CrawlerService([m.strip().upper() for m in args.markets.split(",") if m.strip()],
+                             interval=args.interval, workers=args.workers, news_mode=args.news_mode)
+    signal.signal(signal.SIGTERM, service.stop)
+    server = serve_http(service, args.host, args.port)
+    try:
+        service.loop()
+    except KeyboardInterrupt:
+        service.stop()
+    server.shutdown()
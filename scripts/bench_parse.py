@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Compare the old full-page html.parser path with backend.html_parse on the saved Naver page.
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from backend import html_parse
+
+HTML_PATH = os.path.join(os.path.dirname(__file__), "naver_main.html")
+ROUNDS = 20
+
+with open(HTML_PATH, "r", encoding="utf-8", errors="replace") as f:
+    html = f.read()
+
+# naver_main.html is an item main page, so its tb_type1 tables stand in for the list tables
+target = SoupStrainer("table", class_=html_parse.has_class("tb_type1"))
+
+def bench(label, fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    print(f"{label:<45} {elapsed:8.2f} ms/page  ({result})")
+    return elapsed
+
+def rows(soup):
+    return [row.get_text(strip=True, separator='|') for row in soup.select('table.tb_type1 tr')]
+
+print(f"{len(html):,} chars, parser backend: {html_parse.PARSER}")
+
+# Timings only mean something if the strained parse reads the same rows as the full one
+expected = rows(BeautifulSoup(html, 'html.parser'))
+assert expected, "no table.tb_type1 rows in the sample page"
+assert rows(html_parse.make_soup(html, target)) == expected, "strained parse lost rows"
+
+base = bench("html.parser, full page + select", lambda: len(BeautifulSoup(html, 'html.parser').select('table.tb_type1 tr')))
+if html_parse.PARSER != 'html.parser':
+    bench(f"{html_parse.PARSER}, full page + select", lambda: len(BeautifulSoup(html, html_parse.PARSER).select('table.tb_type1 tr')))
+fast = bench(f"{html_parse.PARSER}, strained + select", lambda: len(html_parse.make_soup(html, target).select('table.tb_type1 tr')))
+print(f"Speedup: {base / fast:.1f}x")
+
+full_soup = BeautifulSoup(html, 'html.parser')
+body = full_soup.body or full_soup
+bench("get_text()[:2000]", lambda: len(body.get_text(strip=True, separator='\n')[:2000]))
+bench("text_prefix(2000)", lambda: len(html_parse.text_prefix(body, 2000)))
+assert body.get_text(strip=True, separator='\n')[:2000] == html_parse.text_prefix(body, 2000)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.headline_clusters import HeadlineClusters, normalize_headline, simhash, mask_name
+
+def _article(title, url):
+    return {"title": title, "url": url, "source": "test"}
+
+def test_same_template_about_different_stocks_stays_separate():
+    clusters = HeadlineClusters()
+    samsung = _article("[특징주] 삼성전자, 외국인 순매수에 52주 신고가 경신", "https://example.com/1")
+    lg = _article("[특징주] LG전자, 외국인 순매수에 52주 신고가 경신", "https://example.com/2")
+    # Close enough that the raw hashes alone would have merged them
+    a, b = normalize_headline(samsung["title"])[0], normalize_headline(lg["title"])[0]
+    assert bin(simhash(a) ^ simhash(b)).count("1") <= 20
+    assert clusters.assign(samsung, "삼성전자") != clusters.assign(lg, "LG전자")
+
+def test_placeholders_never_cluster():
+    clusters = HeadlineClusters()
+    placeholders = [
+        {"title": f"{name}, 시장 흐름 및 관련 테마 분석", "url": f"https://finance.naver.com/item/news.naver?code={code}",
+         "source": "증권정보", "placeholder": True}
+        for name, code in [("삼성전자", "005930"), ("LG전자", "066570"), ("삼성전기", "009150")]
+    ]
+    ids = {clusters.assign(article, article["title"].split(",")[0]) for article in placeholders}
+    assert len(ids) == 3
+    # Day files written before the flag: recognised by title and URL
+    legacy = dict(placeholders[0])
+    del legacy["placeholder"]
+    assert clusters.assign(legacy, "삼성전자") not in ids
+
+def test_rewrite_of_one_story_merges_within_a_stock():
+    clusters = HeadlineClusters()
+    first = _article("SK하이닉스, 미 샌디스크와 차세대 메모리 HBF 글로벌 표준화", "https://example.com/1")
+    rewrite = _article("SK하이닉스, 샌디스크와 차세대 메모리 HBF 글로벌 표준화 착수", "https://example.com/2")
+    assert clusters.assign(first, "SK하이닉스") == clusters.assign(rewrite, "SK하이닉스")
+    collapsed = clusters.collapse([first, rewrite], "SK하이닉스")
+    assert len(collapsed) == 1 and collapsed[0]["cluster_size"] == 2
+
+def test_identical_headline_shared_across_stocks():
+    clusters = HeadlineClusters()
+    title = "외국인 역대 최대 매도…개인 방어에도 코스피 6300선 내줘"
+    assert clusters.assign(_article(title, "https://example.com/1"), "삼성전자") == \
+        clusters.assign(_article(title, "https://example.com/2"), "SK하이닉스")
+
+def test_mask_name():
+    assert mask_name(normalize_headline("LG전자, 신고가")[0], "LG전자") == "§신고가"
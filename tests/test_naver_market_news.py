@@ -0,0 +1,18 @@
+import requests
+from bs4 import BeautifulSoup
+
+# Inspect the market-wide listing parsed by crawler.scrape_market_news
+url = "https://finance.naver.com/news/news_list.naver?mode=LSS2D&section_id=101&section_id2=258&page=1"
+headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+res = requests.get(url, headers=headers)
+res.encoding = 'euc-kr'
+soup = BeautifulSoup(res.text, 'html.parser')
+
+subjects = soup.select('.realtimeNewsList .articleSubject')
+print(f"Found {len(subjects)} headlines")
+for subject in subjects[:5]:
+    a_tag = subject.select_one('a')
+    summary = subject.find_next_sibling('dd', class_='articleSummary')
+    wdate = summary.select_one('.wdate') if summary else None
+    press = summary.select_one('.press') if summary else None
+    print(a_tag.get_text(strip=True) if a_tag else None, "|", press.get_text(strip=True) if press else None, "|", wdate.get_text(strip=True) if wdate else None)
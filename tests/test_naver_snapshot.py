@@ -0,0 +1,20 @@
+import time
+import requests
+
+# Check that the marketValue APIs used by crawler.get_market_snapshot expose change rates
+endpoints = {
+    "KOSPI": "https://m.stock.naver.com/api/stocks/marketValue/KOSPI",
+    "NASDAQ": "https://api.stock.naver.com/stock/exchange/NASDAQ/marketValue",
+}
+headers = {"User-Agent": "Mozilla/5.0"}
+
+for name, url in endpoints.items():
+    start = time.time()
+    try:
+        res = requests.get(url, params={"page": 1, "pageSize": 100}, headers=headers, timeout=10)
+        stocks = res.json().get('stocks', [])
+        print(f"{name}: {len(stocks)} rows in {time.time() - start:.2f} seconds")
+        for item in stocks[:3]:
+            print(item.get("symbolCode") or item.get("itemCode"), item.get("stockName"), item.get("fluctuationsRatio"), item.get("localTradedAt"))
+    except Exception as e:
+        print(f"{name} Failed:", e)